@@ -0,0 +1,360 @@
+"""
+Benchmarks the download, playlist and thumbnail code paths against a local
+stand-in server, so no network access or GPU is needed.
+
+    python -m benchmarks.run [--size 32M] [--videos 50] [--throttle 0] [--baseline old.json]
+
+Each scenario runs in a fresh process so its peak memory isn't inflated by
+the previous ones. Results are written as JSON to `benchmarks/results/`,
+named after the date and commit, to be compared with `--baseline`.
+"""
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+
+from concurrent.futures import ProcessPoolExecutor
+from datetime           import datetime
+from pathlib            import Path
+from time               import monotonic, process_time
+
+from benchmarks.server import StandInServer
+from src               import ratelimit
+
+RESULTS_PATH   = Path(__file__).parent / "results"
+SCENARIOS      = ["download", "playlist", "thumbnails"]
+SEGMENTS       = [1, 4]
+THUMBNAILS     = 50
+THUMBNAIL_SIZE = (300, 200) # same as main.py
+# lower is better for these, higher for everything else.
+LOWER_IS_BETTER = ("seconds", "ttfb", "latency", "rss", "cpu", "failed", "corrupted")
+
+
+def peak_rss() -> int:
+    """
+    Peak resident memory of this process in bytes.
+    """
+    if sys.platform == "win32":
+        import ctypes
+        from ctypes import wintypes
+
+        class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+            _fields_ = [
+                ("cb", wintypes.DWORD),
+                ("PageFaultCount", wintypes.DWORD),
+                ("PeakWorkingSetSize", ctypes.c_size_t),
+                ("WorkingSetSize", ctypes.c_size_t),
+                ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                ("PagefileUsage", ctypes.c_size_t),
+                ("PeakPagefileUsage", ctypes.c_size_t),
+            ]
+
+        counters    = PROCESS_MEMORY_COUNTERS()
+        counters.cb = ctypes.sizeof(counters)
+        process     = ctypes.windll.kernel32.GetCurrentProcess()
+        ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb)
+        return counters.PeakWorkingSetSize
+
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS.
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def percentiles(values: list[float]) -> dict:
+    if not values:
+        return {}
+    values = sorted(values)
+
+    def at(p: float) -> float:
+        return round(values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))], 4)
+
+    return {"p50": at(50), "p90": at(90), "p99": at(99), "max": round(values[-1], 4)}
+
+
+class Meter:
+    """
+    Wall time, CPU time and peak memory of the block it wraps. CPU use is in
+    percent of one core, so it goes over 100 when several threads are busy.
+    """
+    def __enter__(self):
+        self.started = monotonic()
+        self.cpu     = process_time()
+        return self
+
+    def __exit__(self, *exc):
+        self.seconds = monotonic() - self.started
+        self.cpu     = process_time() - self.cpu
+
+    def results(self, size: int = 0) -> dict:
+        results = {
+            "seconds": round(self.seconds, 4),
+            "cpu_percent": round(self.cpu / self.seconds * 100, 1) if self.seconds else 0.0,
+            "peak_rss_mb": round(peak_rss() / 1024 ** 2, 1),
+        }
+        if size:
+            results["throughput_mbps"] = round(size / 1024 ** 2 / self.seconds, 2)
+        return results
+
+
+def file_sha256(path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while block := f.read(1024 * 1024):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def stream_sha256(server_url: str) -> str:
+    from src import network
+
+    response = network.get(f"{server_url}/checksum")
+    response.raise_for_status()
+    return response.json()["sha256"]
+
+
+class StandInResolver:
+    """
+    Resolves videos from the stand-in server's manifests, in place of
+    `resolver.ProcessResolver`.
+    """
+    def __init__(self, server_url: str):
+        self.server_url = server_url
+        self.started    = {}
+
+    def resolve(self, url: str, audio_only: bool = False, resolution: str = None) -> list:
+        from pytubefix import extract
+        from src       import network, resolver
+
+        self.started[url] = monotonic()
+        response = network.get(f"{self.server_url}/manifest", params = {"v": extract.video_id(url)})
+        response.raise_for_status()
+        return [resolver.StreamInfo(**response.json())]
+
+
+def playlist_urls(server_url: str):
+    """
+    Reads the playlist page by page, like pytubefix does with continuations.
+    """
+    from src import network
+
+    page = 0
+    while page is not None:
+        response = network.get(f"{server_url}/playlist", params = {"list": "PLbenchmark", "page": page})
+        response.raise_for_status()
+        data = response.json()
+        yield from data["videos"]
+        page = data["next_page"]
+
+
+def bench_download(server_url: str, options: dict) -> dict:
+    from src import downloader, network, resolver
+
+    results = {}
+    sha256  = stream_sha256(server_url)
+    with tempfile.TemporaryDirectory() as folder:
+        for segments in options["segments"]:
+            stream   = resolver.StreamInfo(**network.get(f"{server_url}/manifest", params = {"v": "bench000000"}).json())
+            filepath = Path(folder) / f"{segments}.mp4"
+            first    = []
+
+            def on_chunk(size: int):
+                if not first:
+                    first.append(monotonic())
+
+            with Meter() as meter:
+                downloader.download_stream(stream, filepath, on_chunk, segments)
+            if os.path.getsize(filepath) != stream.filesize:
+                raise IOError(f"Downloaded {os.path.getsize(filepath)} of {stream.filesize} bytes.")
+            if file_sha256(filepath) != sha256:
+                raise IOError(f"Downloaded file doesn't match the server's content with {segments} segments.")
+            results[f"segments_{segments}"] = {
+                **meter.results(stream.filesize),
+                "ttfb_seconds": round(first[0] - meter.started, 4),
+            }
+            os.remove(filepath)
+    return results
+
+
+def bench_playlist(server_url: str, options: dict) -> dict:
+    from src import downloader
+
+    stream_resolver = StandInResolver(server_url)
+    latencies       = []
+    failed          = []
+
+    def on_item_done(item):
+        if item.status != "Done":
+            failed.append(item.url)
+        elif item.url in stream_resolver.started:
+            latencies.append(monotonic() - stream_resolver.started[item.url])
+
+    sha256 = stream_sha256(server_url)
+    with tempfile.TemporaryDirectory() as folder:
+        engine = downloader.PlaylistDownloader(
+            playlist_urls(server_url),
+            folder,
+            workers         = options["workers"],
+            max_connections = options["workers"],
+            total           = options["videos"],
+            stream_resolver = stream_resolver,
+        )
+        with Meter() as meter:
+            engine.run(on_item_done)
+        corrupted = sum(1 for path in Path(folder).glob("*.mp4") if file_sha256(path) != sha256)
+    return {
+        **meter.results(options["size"] * engine.completed),
+        "videos": engine.completed,
+        "failed": len(failed),
+        "corrupted": corrupted,
+        "videos_per_second": round(engine.completed / meter.seconds, 2),
+        "item_latency_seconds": percentiles(latencies),
+    }
+
+
+def bench_thumbnails(server_url: str, options: dict) -> dict:
+    # same steps as `download_thumbnail()` in main.py.
+    from src import media, network
+
+    latencies = []
+    with Meter() as meter:
+        for i in range(options["thumbnails"]):
+            started  = monotonic()
+            response = network.get(f"{server_url}/vi/bench{i:06d}/hqdefault.jpg")
+            response.raise_for_status()
+            media.decode_image_bytes(response.content, THUMBNAIL_SIZE)
+            latencies.append(monotonic() - started)
+    return {
+        **meter.results(),
+        "thumbnails_per_second": round(options["thumbnails"] / meter.seconds, 2),
+        "latency_seconds": percentiles(latencies),
+    }
+
+
+BENCHMARKS = {
+    "download": bench_download,
+    "playlist": bench_playlist,
+    "thumbnails": bench_thumbnails,
+}
+
+
+def run_scenario(name: str, server_url: str, options: dict) -> dict:
+    with ProcessPoolExecutor(max_workers = 1, mp_context = multiprocessing.get_context("spawn")) as pool:
+        return pool.submit(BENCHMARKS[name], server_url, options).result()
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output = True,
+            text           = True,
+            cwd            = Path(__file__).parent,
+        ).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def flatten(results: dict, prefix: str = "") -> dict:
+    flat = {}
+    for key, value in results.items():
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{prefix}{key}."))
+        elif isinstance(value, (int, float)):
+            flat[f"{prefix}{key}"] = value
+    return flat
+
+
+def compare(baseline: dict, current: dict) -> list[str]:
+    """
+    One line per metric found in both runs, with its change in percent.
+    Changes for the worse are marked with "!".
+    """
+    old   = flatten(baseline["scenarios"])
+    new   = flatten(current["scenarios"])
+    lines = []
+    for key in sorted(old.keys() & new.keys()):
+        if not old[key]:
+            continue
+        change = (new[key] - old[key]) / old[key] * 100
+        worse  = change > 0 if any(word in key for word in LOWER_IS_BETTER) else change < 0
+        mark   = "!" if worse and abs(change) >= 5 else " "
+        lines.append(f"{mark} {key:<50} {old[key]:>12} -> {new[key]:<12} ({change:+.1f}%)")
+    return lines
+
+
+def parse_args(argv = None):
+    parser = argparse.ArgumentParser(prog = "python -m benchmarks.run", description = "Benchmarks YTD against a local stand-in server.")
+    parser.add_argument("-s", "--scenario", action = "append", choices = SCENARIOS, help = "scenario to run, can be repeated (default: all)")
+    parser.add_argument("--size", type = ratelimit.parse_rate, default = "32M", help = "size of every video stream (default: %(default)s)")
+    parser.add_argument("--videos", type = int, default = 50, help = "playlist length (default: %(default)s)")
+    parser.add_argument("--workers", type = int, default = 4, help = "playlist workers (default: %(default)s)")
+    parser.add_argument("--thumbnails", type = int, default = THUMBNAILS, help = "thumbnails to load (default: %(default)s)")
+    parser.add_argument("--throttle", type = ratelimit.parse_rate, default = "0", help = "server speed per connection, e.g. 5M (default: unlimited)")
+    parser.add_argument("--latency", type = float, default = 0, help = "delay before every server response, in seconds (default: %(default)s)")
+    parser.add_argument("--no-ranges", action = "store_true", help = "make the server ignore byte ranges")
+    parser.add_argument("--output", help = "results file (default: benchmarks/results/<date>-<commit>.json)")
+    parser.add_argument("--baseline", help = "results file of an earlier run to compare with")
+    return parser.parse_args(argv)
+
+
+def main(argv = None) -> int:
+    args    = parse_args(argv)
+    options = {
+        "size": args.size,
+        "videos": args.videos,
+        "workers": args.workers,
+        "thumbnails": args.thumbnails,
+        "segments": SEGMENTS,
+        "throttle": args.throttle,
+        "latency": args.latency,
+        "ranges": not args.no_ranges,
+    }
+    commit  = git_commit()
+    results = {
+        "commit": commit,
+        "date": datetime.now().isoformat(timespec = "seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "options": options,
+        "scenarios": {},
+    }
+
+    failed = []
+    server = StandInServer(args.size, args.videos, args.throttle, args.latency, not args.no_ranges)
+    with server:
+        for name in args.scenario or SCENARIOS:
+            print(f"Running {name}...", flush = True)
+            try:
+                results["scenarios"][name] = run_scenario(name, server.url, options)
+            except Exception as e:
+                # one broken scenario doesn't throw away the others' results.
+                results["scenarios"][name] = {"error": f"{type(e).__name__}: {e}"}
+                failed.append(name)
+                print(f"{name} failed: {type(e).__name__}: {e}", file = sys.stderr, flush = True)
+                continue
+            print(json.dumps(results["scenarios"][name], indent = 2), flush = True)
+
+    output = Path(args.output) if args.output else RESULTS_PATH / f"{datetime.now():%Y%m%d-%H%M%S}-{commit or 'unknown'}.json"
+    output.parent.mkdir(parents = True, exist_ok = True)
+    with open(output, "w", encoding = "utf-8") as f:
+        json.dump(results, f, indent = 2)
+    print(f"Results saved to {output}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding = "utf-8") as f:
+            print("\n".join(compare(json.load(f), results)))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,215 @@
+"""
+Local stand-in for the YouTube endpoints the app talks to, so benchmarks
+run without network access:
+
+    /videoplayback?id=ID    stream bytes, with byte range support
+    /checksum               sha256 of every stream, to check downloads
+    /manifest?v=ID          the stream of a video, as resolved metadata
+    /playlist?list=ID       a playlist as pages of watch links
+    /vi/ID/hqdefault.jpg    a jpg thumbnail
+
+Runs in its own process so its CPU time and memory don't count against
+the code being measured.
+"""
+import hashlib
+import json
+import multiprocessing
+import os
+import re
+import sys
+
+from http.server  import BaseHTTPRequestHandler, ThreadingHTTPServer
+from time         import monotonic, sleep
+from urllib.parse import parse_qs, urlsplit
+
+CHUNK_SIZE     = 65536
+DATA_SIZE      = 4 * 1024 * 1024 # multiple of CHUNK_SIZE
+PAGE_SIZE      = 100 # videos per playlist page, like YouTube's continuations
+THUMBNAIL_SIZE = (480, 360)
+
+
+def video_ids(count: int) -> list[str]:
+    return [f"bench{i:06d}" for i in range(count)]
+
+
+def stream_sha256(data: bytes, size: int) -> str:
+    # same bytes as `Handler.stream_bytes()`.
+    digest = hashlib.sha256()
+    for pos in range(0, size, len(data)):
+        digest.update(data[:size - pos])
+    return digest.hexdigest()
+
+
+def make_thumbnail() -> bytes:
+    import cv2
+    import numpy as np
+
+    w, h     = THUMBNAIL_SIZE
+    gradient = np.linspace(0, 255, w, dtype = np.uint8)
+    img      = np.dstack([np.tile(gradient, (h, 1)), np.tile(gradient[::-1], (h, 1)), np.full((h, w), 128, np.uint8)])
+    _, data  = cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, 90])
+    return data.tobytes()
+
+
+class Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # clients dropping idle keep-alive connections isn't worth a traceback.
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version        = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    # set by `serve()`.
+    config    = None
+    data      = b""
+    sha256    = ""
+    thumbnail = b""
+
+    def log_message(self, *args):
+        pass
+
+    def do_HEAD(self):
+        self.route(head = True)
+
+    def do_GET(self):
+        self.route()
+
+    def route(self, head: bool = False):
+        parts = urlsplit(self.path)
+        query = {k: v[0] for k, v in parse_qs(parts.query).items()}
+        if self.config["latency"]:
+            sleep(self.config["latency"])
+
+        if parts.path == "/videoplayback":
+            self.send_stream(head)
+        elif parts.path == "/checksum":
+            self.send_json({"size": self.config["size"], "sha256": self.sha256})
+        elif parts.path == "/manifest":
+            self.send_json(self.manifest(query.get("v", "")))
+        elif parts.path == "/playlist":
+            self.send_json(self.playlist_page(int(query.get("page", 0))))
+        elif parts.path.endswith("/hqdefault.jpg"):
+            self.send_body(200, self.thumbnail, "image/jpeg", head = head)
+        else:
+            self.send_body(404, b"not found", "text/plain", head = head)
+
+    def manifest(self, video_id: str) -> dict:
+        return {
+            "video_id": video_id,
+            "title": f"Benchmark video {video_id}",
+            "url": f"http://{self.headers['Host']}/videoplayback?id={video_id}",
+            "itag": 18,
+            "filesize": self.config["size"],
+            "default_filename": f"{video_id}.mp4",
+        }
+
+    def playlist_page(self, page: int) -> dict:
+        ids  = video_ids(self.config["videos"])
+        urls = [f"https://www.youtube.com/watch?v={video_id}" for video_id in ids[page * PAGE_SIZE:(page + 1) * PAGE_SIZE]]
+        return {"videos": urls, "next_page": page + 1 if (page + 1) * PAGE_SIZE < len(ids) else None}
+
+    def send_json(self, data: dict):
+        self.send_body(200, json.dumps(data).encode(), "application/json")
+
+    def send_body(self, status: int, body: bytes, content_type: str, headers: dict = None, head: bool = False):
+        self.send_headers(status, len(body), content_type, headers)
+        if not head:
+            self.write_throttled(0, len(body), lambda pos, size: body[pos:pos + size])
+
+    def send_headers(self, status: int, length: int, content_type: str, headers: dict = None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(length))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+
+    def send_stream(self, head: bool):
+        size    = self.config["size"]
+        match   = re.match(r"bytes=(\d+)-(\d*)", self.headers.get("Range", ""))
+        headers = {"Accept-Ranges": "bytes"} if self.config["ranges"] else {}
+        start   = 0
+        end     = size - 1
+        status  = 200
+        if match and self.config["ranges"]:
+            start = int(match.group(1))
+            end   = min(int(match.group(2) or end), end)
+            if start >= size:
+                return self.send_body(416, b"", "video/mp4", {"Content-Range": f"bytes */{size}"}, head)
+            headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+            status = 206
+        self.send_headers(status, end - start + 1, "video/mp4", headers)
+        if not head:
+            self.write_throttled(start, end + 1, self.stream_bytes)
+
+    def stream_bytes(self, pos: int, size: int) -> bytes:
+        # every video is the same random block repeated up to its size.
+        offset = pos % len(self.data)
+        return self.data[offset:offset + size]
+
+    def write_throttled(self, start: int, stop: int, read):
+        rate    = self.config["throttle"]
+        started = monotonic()
+        pos     = start
+        try:
+            while pos < stop:
+                chunk = read(pos, min(CHUNK_SIZE, stop - pos))
+                self.wfile.write(chunk)
+                pos += len(chunk)
+                if rate:
+                    ahead = (pos - start) / rate - (monotonic() - started)
+                    if ahead > 0:
+                        sleep(ahead)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+def serve(config: dict, port_queue):
+    Handler.config    = config
+    Handler.data      = os.urandom(DATA_SIZE)
+    Handler.sha256    = stream_sha256(Handler.data, config["size"])
+    Handler.thumbnail = make_thumbnail()
+    server = Server(("127.0.0.1", 0), Handler)
+    port_queue.put(server.server_address[1])
+    server.serve_forever()
+
+
+class StandInServer:
+    """
+    Starts the server in a child process. `size` is the size of every video
+    stream in bytes, `videos` the length of the playlist, `throttle` caps
+    each connection in bytes per second (0 for no cap) and `latency` is
+    added before every response, in seconds. Use it as a context manager.
+    """
+    def __init__(self, size: int = 32 * 1024 * 1024, videos: int = 50, throttle: float = 0, latency: float = 0, ranges: bool = True):
+        self.config  = {"size": size, "videos": videos, "throttle": throttle, "latency": latency, "ranges": ranges}
+        self.port    = None
+        self.process = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def start(self):
+        context      = multiprocessing.get_context("spawn")
+        port_queue   = context.Queue()
+        self.process = context.Process(target = serve, args = (self.config, port_queue), daemon = True)
+        self.process.start()
+        self.port = port_queue.get(timeout = 30)
+        return self
+
+    def stop(self):
+        if self.process:
+            self.process.terminate()
+            self.process.join()
+            self.process = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
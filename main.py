@@ -1,11 +1,14 @@
 import os
 import sys
 
+from src import utils
+
+STARTUP = utils.StartupTimer()
+
 if getattr(sys, 'frozen', False):
     import pyi_splash # type: ignore
 
 from win32gui import FindWindow, SetForegroundWindow
-from src      import gui, utils
 from pathlib  import Path
 
 LOG         = utils.LOGGER()
@@ -17,24 +20,47 @@ if this_window != 0:
     LOG.warning("YTD is aleady running! Only one instance can be launched at once.\n")
     SetForegroundWindow(this_window)
     sys.exit(0)
-LOG.OnStart(PARENT_PATH)
+STARTUP.mark("Single instance check")
 
 import atexit
 import imgui
-import requests
 import subprocess
 import webbrowser
 
 from concurrent.futures      import ThreadPoolExecutor
 from datetime                import datetime, timedelta
 from imgui.integrations.glfw import GlfwRenderer
-from pytubefix               import YouTube as YT, Channel, Playlist
-from threading               import Thread
+from src                     import gui, jobs, media, metrics, progress, ratelimit, urls
+from threading               import Lock, Thread
 from time                    import sleep
 
+# everything below pulls in pytubefix and requests, which aren't needed to
+# show the window. They're imported on first use or by `warm_up()`.
+archive      = utils.LazyModule("src.archive")
+cipher_cache = utils.LazyModule("src.cipher_cache")
+downloader   = utils.LazyModule("src.downloader")
+metadata     = utils.LazyModule("src.metadata")
+network      = utils.LazyModule("src.network")
+STARTUP.mark("GUI imports")
+
 DOWNLOAD_PATH  = './YTDownloads'
-THUMBNAIL_PATH = './.thumbnail'
+CACHE_PATH     = './.ytd_cache'
+QUEUE_PATH     = './.ytd_queue.json'
+METRICS_PATH   = './.ytd_metrics'
+FPS_CAP        = 60
+BACKGROUND_FPS = 10
+MAX_SPEED      = 100 # MB/s
+MAX_PARALLEL   = 4
+THUMBNAIL_SIZE = (300, 200)
 AUDIO_FORMATS  = ["mp3", "m4a"]
+STAGE_NAMES    = {
+    "resolve": "URL resolution",
+    "channel": "Channel lookup",
+    "select": "Stream selection",
+    "first_byte": "First byte",
+    "transfer": "Transfer",
+    "postprocess": "Post-processing",
+}
 RESOLUTIONS    = [
     "Auto",
     "144p", 
@@ -50,20 +76,30 @@ RESOLUTIONS    = [
 
 Icons                = gui.Icons
 executor             = ThreadPoolExecutor(max_workers=2)
+texture_cache        = gui.TextureCache()
+scheduler            = gui.FrameScheduler(fps = FPS_CAP, background_fps = BACKGROUND_FPS)
+progress_bus         = progress.ProgressBus()
+metadata_cache       = None
+metadata_cache_lock  = Lock()
 res_index            = 0
 fmt_index            = 0
 video_link           = ""
-current_filepath     = ""
 task_status          = "Idle."
 is_available         = False
 is_playlist          = False
-thumb_downloaded     = False
 audio_only           = False
-download_in_progress = False
-thumb_texture        = None
+thumbnail            = None
 video_info_thread    = None
-current_filesize     = 0
-progress_value       = 0
+info_generation      = 0
+playlist_loader      = None
+playlist_workers     = 4
+speed_limit          = 0
+parallel_jobs        = 2
+show_queue           = False
+show_stats           = False
+job_snapshots        = {}
+job_queue            = jobs.JobQueue(lambda job: run_job(job), progress_bus, QUEUE_PATH, max_running = parallel_jobs)
+metrics_exporter     = metrics.Exporter(metrics.REGISTRY, METRICS_PATH)
 video_info           = {
     "title": "",
     "thumbnail": "",
@@ -73,6 +109,7 @@ video_info           = {
     "channel_name": "",
     "date": "",
     "video_count": 0,
+    "entries": [],
 }
 
 
@@ -97,23 +134,26 @@ def tooltip(text="", font=None, alpha=0.75):
         imgui.pop_style_var()
 
 
-def execute_once(func):
-    def wrapper(*args, **kwargs):
-        if not wrapper.has_run:
-            wrapper.has_run = True
-            return func(*args, **kwargs)
-    wrapper.has_run = False
-    return wrapper
+def clear_thumbnail():
+    global thumbnail
+    thumbnail = None
 
 
-def remove_thumbnails_folder():
-    global thumb_downloaded
-    thumb_downloaded = False
-    if os.path.exists(THUMBNAIL_PATH):
-        if os.path.isfile(f"{THUMBNAIL_PATH}/temp.jpg"):
-            os.remove(f"{THUMBNAIL_PATH}/temp.jpg")
-        os.rmdir(THUMBNAIL_PATH)
-remove_thumbnails_folder()
+def get_metadata_cache():
+    global metadata_cache
+    with metadata_cache_lock:
+        if metadata_cache is None:
+            cipher_cache.install(CACHE_PATH)
+            metadata_cache = metadata.MetadataCache(cache_dir = CACHE_PATH)
+    return metadata_cache
+
+
+def warm_up():
+    LOG.OnStart(PARENT_PATH)
+    for module in (network, metadata, cipher_cache, downloader, archive, media.cv2, media.np):
+        module.load()
+    get_metadata_cache()
+    LOG.info("Background modules loaded.")
 
 
 def open_downloads_folder():
@@ -153,30 +193,6 @@ def get_date_diff(video_date: datetime) -> str:
         return str(days) + (" days ago." if days > 1 else " day ago.")
 
 
-def is_valid_url(url) -> bool:
-    try:
-        _ = YT(url)
-        return True
-    except Exception:
-        return False
-
-
-def is_playlist_url(url) -> bool:
-    try:
-        return str(url).find("list=") != -1
-    except Exception:
-        return False
-
-
-def is_video_available(url) -> bool:
-    try:
-        video = YT(url)
-        video.check_availability() 
-        return True
-    except Exception:
-        return False
-
-
 def clear_info_table():
     global video_info
     video_info = {
@@ -188,89 +204,126 @@ def clear_info_table():
         "channel_name": "",
         "date": "",
         "video_count": 0,
+        "entries": [],
     }
 
 
 def download_thumbnail():
-    global thumb_downloaded
-    thumb_downloaded = False
+    global thumbnail
+    thumbnail = None
     try:
         LOG.info("Downloading YouTube Thumbnail...")
         url = video_info["thumbnail"]
-        response = requests.get(url, stream = True)
+        response = network.get(url)
         if response.status_code == 200:
-            if not os.path.exists(THUMBNAIL_PATH):
-                os.makedirs(THUMBNAIL_PATH)
-                # if os.name == "nt":
-                #     os.system(f'attrib +h "{THUMBNAIL_PATH}"')
-
-            img_path = Path(THUMBNAIL_PATH) / "temp.jpg"
-            with open(img_path, "wb") as file:
-                LOG.info("Writing thumbnail image to disk...")
-                for chunk in response.iter_content(1024):
-                    file.write(chunk)
-                file.close()
-                thumb_downloaded = True
-                LOG.info(f"Thumbnail image saved to {os.path.abspath(THUMBNAIL_PATH)}")
+            image = media.decode_image_bytes(response.content, THUMBNAIL_SIZE)
+            # a newer lookup may have started while this one was in flight.
+            if url == video_info["thumbnail"]:
+                thumbnail = (url, image)
+                scheduler.wake()
+                LOG.info("Thumbnail image loaded.")
     except Exception as e:
-        thumb_downloaded = False
+        thumbnail = None
         LOG.error(f"Failed to download thumbnail image: {e}")
         pass
 
 
-def get_video_info():
+def cancel_playlist_loader():
+    global playlist_loader
+    if playlist_loader:
+        playlist_loader.cancel()
+        playlist_loader = None
+
+
+def on_playlist_entry(loader: "metadata.PlaylistInfoLoader", entry: dict):
+    global task_status
+    if loader.cancelled:
+        return
+    video_info["video_count"] = loader.video_count
+    video_info["duration"]    = format_time(loader.duration)
+    video_info["entries"]     = loader.snapshot()
+    task_status = f"{Icons.Spinner} Loading information... ({loader.resolved}/{loader.total})"
+    scheduler.wake()
+
+
+def is_current_lookup(generation: int) -> bool:
+    return generation == info_generation
+
+
+def get_video_info(generation: int):
     global task_status
-    global video_info
-    global video_link
     global is_available
     global is_playlist
-
-    if len(video_link) > 0:
-        if is_valid_url(video_link):
-            remove_thumbnails_folder()
-            is_playlist = is_playlist_url(video_link)
+    global playlist_loader
+
+    # a newer lookup replaces `video_info` and bumps `info_generation`, this
+    # one then stops touching the shared state.
+    info      = video_info
+    link_text = video_link
+    if len(link_text) > 0:
+        link = urls.parse(link_text)
+        if link and link.kind == urls.CHANNEL:
+            is_available = False
+            task_status = "Channel links aren't supported."
+            LOG.warning("Failed to get information! Channel links aren't supported.")
+            clear_info_table()
+        elif link:
+            clear_thumbnail()
+            is_playlist = link.kind == urls.PLAYLIST
             task_status = f"{Icons.Spinner} Loading information..."
-            LOG.info(f"Loading information from {video_link}")
+            LOG.info(f"Loading information from {link_text}")
             if not is_playlist:
                 try:
-                    video = YT(video_link)
+                    details = get_metadata_cache().video_details(link.url)
+                    if not is_current_lookup(generation):
+                        return
                     is_available = True
-                    video_info["title"]        = video.title
-                    video_info["thumbnail"]    = video.thumbnail_url
-                    video_info["duration"]     = format_time(video.length)
-                    video_info["views"]        = f"{video.views:,}"
-                    video_info["date"]         = get_date_diff(video.publish_date)
-                    video_info["channel_url"]  = Channel(video.channel_url)
-                    video_info["channel_name"] = Channel(video.channel_url).channel_name
-                    LOG.info(f"The link provided is a YouTube video from {video_info["channel_name"]} with {video_info["views"]} total views.")
+                    info["title"]        = details["title"]
+                    info["thumbnail"]    = details["thumbnail_url"]
+                    info["duration"]     = format_time(details["length"])
+                    info["views"]        = f"{details["views"]:,}"
+                    info["date"]         = get_date_diff(datetime.fromisoformat(details["publish_date"])) if details["publish_date"] else ""
+                    info["channel_url"]  = details["channel_url"]
+                    info["channel_name"] = details["channel_name"]
+                    LOG.info(f"The link provided is a YouTube video from {info["channel_name"]} with {info["views"]} total views.")
                     task_status = "Done."
                 except Exception:
+                    if not is_current_lookup(generation):
+                        return
                     is_available = False
                     task_status = "This video is unavailable!"
                     clear_info_table()
                     LOG.info("This video is unavailable!")
             else:
                 try:
-                    duration_count = 0
-                    playlist = Playlist(video_link)
+                    playlist     = get_metadata_cache().playlist(link.url)
+                    channel_name = get_metadata_cache().channel_name(playlist.owner_url)
+                    if not is_current_lookup(generation):
+                        return
                     is_available = True
-                    video_info["title"] = playlist.title
-                    video_info["thumbnail"] = playlist.thumbnail_url
-                    video_info["views"] = f"{playlist.views:,}"
-                    video_info["date"] = ""
-                    video_info["channel_url"]  = Channel(playlist.owner_url)
-                    video_info["channel_name"] = Channel(playlist.owner_url).channel_name
-                    for vid in playlist.videos:
-                        video_info["video_count"] += 1
-                        duration_count += vid.length
-                    video_info["duration"] = format_time(duration_count)
+                    info["title"] = playlist.title
+                    info["thumbnail"] = playlist.thumbnail_url
+                    info["views"] = f"{playlist.views:,}"
+                    info["date"] = ""
+                    info["channel_url"]  = playlist.owner_url
+                    info["channel_name"] = channel_name
+                    download_thumbnail()
+                    loader = playlist_loader = metadata.PlaylistInfoLoader(metadata_cache = get_metadata_cache())
+                    loader.load(playlist.video_urls, on_playlist_entry)
+                    if loader.cancelled or not is_current_lookup(generation):
+                        LOG.info("Playlist lookup cancelled.")
+                        return
+                    info["video_count"] = loader.video_count
+                    info["duration"]    = format_time(loader.duration)
                     task_status = "Done."
-                    LOG.info(f"The link provided is a YouTube playlist with {video_info["video_count"]} videos totaling {video_info["duration"]} of watch time.")
+                    LOG.info(f"The link provided is a YouTube playlist with {info["video_count"]} videos totaling {info["duration"]} of watch time.")
                 except Exception:
+                    if not is_current_lookup(generation):
+                        return
                     clear_info_table()
                     task_status = "This playlist is unavailable."
                     LOG.error("Playlist unavailable.")
-            if video_info["thumbnail"] != "":
+            if info["thumbnail"] != "" and not thumbnail and is_current_lookup(generation):
                 download_thumbnail()
         else:
             is_available = False
@@ -281,15 +334,39 @@ def get_video_info():
         is_available = False
         clear_info_table()
     sleep(3)
-    task_status = "Ready."
+    if is_current_lookup(generation):
+        task_status = "Ready."
+        scheduler.wake()
 
 
 def run_video_info():
     global video_info_thread
-    if video_info_thread and not video_info_thread.done():
-        pass
-    else:
-        video_info_thread = executor.submit(get_video_info)
+    global info_generation
+    # a lookup still running is superseded, not waited for: it's cancelled
+    # and whatever it finds afterwards is ignored.
+    cancel_playlist_loader()
+    info_generation  += 1
+    video_info_thread = executor.submit(get_video_info, info_generation)
+
+
+def playlist_tooltip(font, max_entries = 15):
+    entries = video_info["entries"]
+    if not entries or not imgui.is_item_hovered():
+        return
+    lines = [f"{format_time(e["length"])}  {e["title"]}" for e in entries[:max_entries]]
+    if len(entries) > max_entries:
+        lines.append(f"... and {len(entries) - max_entries} more.")
+    if video_info["duration"]:
+        lines.append(f"\nTotal duration: {video_info["duration"]}")
+    tooltip("\n".join(lines), font)
+
+
+def playlist_progress_tooltip(snapshot: dict, font):
+    items = snapshot["active_items"]
+    if not items:
+        return
+    lines = [f"{int(fraction * 100):>3}%  {title}" for title, fraction in items]
+    tooltip("\n".join(lines), font)
 
 
 def is_valid_title() -> bool:
@@ -304,191 +381,267 @@ def is_valid_title() -> bool:
         return False
 
 
-def download_video():
-    global video_link
-    global res_index
-    global task_status
-    global audio_only
-    global current_filesize
-    global current_filepath
-    global download_in_progress
-    global progress_value
-    global is_playlist
+def selected_resolution():
+    return RESOLUTIONS[res_index] if res_index > 0 else None
 
-    try:
-        download_in_progress = True
-        progress_value = 0
-        yt = YT(video_link)
-        if not os.path.exists(DOWNLOAD_PATH):
-            os.makedirs(DOWNLOAD_PATH)
-
-        try:
-            if not audio_only:
-                task_status = f"{Icons.Spinner} Fetching video stream..."
-                if res_index > 0:
-                    stream = yt.streams.filter(
-                        res = RESOLUTIONS[res_index], 
-                        file_extension = 'mp4', 
-                        progressive = True
-                        ).first()
-                else:
-                    stream = yt.streams.get_highest_resolution()
-            else:
-                task_status = f"{Icons.Spinner} Fetching audio stream..."
-                stream = yt.streams.get_audio_only()
-        except Exception as e:
-            task_status = "Unable to get stream."
-            LOG.error(f"Unable to get stream: {e}")
-            pass
-
-        try:
-            LOG.info("Starting download...")
-            current_filesize = stream.filesize
-            LOG.info(f"File size: {round(current_filesize / 1024)} KB")
-            current_filepath = Path(os.path.abspath(DOWNLOAD_PATH)) / Path(os.path.basename(stream.get_file_path(stream.default_filename)))
-            task_status = "Downloading..."
-            with open(current_filepath, "wb") as f:
-                for chunk in stream.iter_chunks(65536):
-                    f.write(chunk)
-                    progress_value += len(chunk)
-                    sleep(0.001)
-
-            if audio_only and fmt_index == 0:
-                old_file = str(current_filepath).replace(".m4a", ".mp3")
-                if os.path.exists(old_file):
-                    os.remove(old_file)
-                base, _ = os.path.splitext(current_filepath)
-                os.rename(current_filepath, base + '.mp3')
-            task_status = "Download complete."
-            LOG.info("Download complete.")
-            sleep(3)
-            progress_value = 0
-            task_status = "Ready."
-            download_in_progress = False
-        except Exception as e:
-            task_status = "Download failed. Check the log for more info."
-            LOG.error(f"Download failed: {e}")
-            sleep(2)
-            task_status = "Ready."
-            download_in_progress = False
 
-    except Exception as e:
-        task_status = f"An exception has occured! Check the log for more info."
-        LOG.error(f"Download failed: {e}")
-        sleep(2)
-        task_status = "Ready."
-        download_in_progress = False
+def speed_limit_slider():
+    global speed_limit
+    imgui.same_line(spacing=10)
+    imgui.set_next_item_width(120)
+    changed, speed_limit = imgui.slider_int(
+        "##speed_limit", speed_limit, 0, MAX_SPEED,
+        "%d MB/s" if speed_limit > 0 else "No limit"
+    )
+    if changed:
+        ratelimit.LIMITER.set_rate(speed_limit * 1024 * 1024)
+    tooltip("Download speed limit shared by all downloads. Can be changed while downloading.", None, 0.8)
+
+
+def job_speed_limit_slider(job: "jobs.Job"):
+    limit = job.rate_limit.rate // (1024 * 1024)
+    imgui.same_line(spacing=10)
+    imgui.set_next_item_width(100)
+    changed, limit = imgui.slider_int(
+        "##job_speed_limit", limit, 0, MAX_SPEED,
+        "%d MB/s" if limit > 0 else "No limit"
+    )
+    if changed:
+        job_queue.set_rate_limit(job.job_id, limit * 1024 * 1024)
+    tooltip("Download speed limit for this link only, on top of the global one. Can be changed while downloading.", None, 0.8)
 
 
-def download_playlist():
-    global video_link
-    global res_index
+def on_job_progress(snapshot: dict):
+    job_snapshots[snapshot["job_id"]] = snapshot
+    scheduler.wake()
+
+
+def job_snapshot(job: "jobs.Job") -> dict:
+    return job_snapshots.get(job.job_id) or job.progress.snapshot()
+
+
+def job_status_text(snapshot: dict) -> str:
+    if snapshot["kind"] == "playlist" and snapshot["state"] == progress.RUNNING:
+        return f"{snapshot["status"]} ({snapshot["items_done"]}/{snapshot["items_total"]})"
+    return snapshot["status"]
+
+
+def running_snapshots() -> list[dict]:
+    return [job_snapshot(job) for job in job_queue.jobs() if job.state == progress.RUNNING]
+
+
+def status_text(running: list[dict]) -> str:
+    if not running:
+        return task_status
+    pending = job_queue.pending()
+    queued  = f" {pending} more queued." if pending else ""
+    if len(running) == 1:
+        return job_status_text(running[0]) + queued
+    return f"{Icons.Spinner} Downloading {len(running)} links...{queued}"
+
+
+def enqueue_download():
     global task_status
-    global audio_only
-    global current_filesize
-    global current_filepath
-    global download_in_progress
-    global progress_value
-    global is_playlist
-    global video_info
+    job_queue.add(
+        urls.normalize(video_link) or video_link,
+        "playlist" if is_playlist else "video",
+        {
+            "audio_only": audio_only,
+            "resolution": selected_resolution(),
+            "mp3": audio_only and fmt_index == 0,
+            "workers": playlist_workers,
+        },
+        title = video_info["title"] or video_link,
+    )
+    task_status = "Added to the download queue."
+
+
+def run_job(job: "jobs.Job"):
+    if job.kind == "playlist":
+        download_playlist(job)
+    else:
+        download_video(job)
 
-    playlist_path    = Path(DOWNLOAD_PATH) / Path(video_info["title"])
-    streams          = []
-    current_stream   = 0
-    current_download = 0
-    progress_value   = 0
+
+def download_video(job: "jobs.Job"):
+    options = job.options
+
+    def on_start(stream, filepath, filesize):
+        job.progress.set_status("Downloading...")
+        LOG.info(f"File size: {round(filesize / 1024)} KB")
+
+    def on_chunk(_):
+        job.check_cancelled()
 
     try:
-        download_in_progress = True
-        yt = Playlist(video_link)
-        if not os.path.exists(DOWNLOAD_PATH):
-            os.makedirs(DOWNLOAD_PATH)
+        job.progress.set_status(f"{Icons.Spinner} Fetching {"audio" if options["audio_only"] else "video"} stream...")
+        downloader.download_video(
+            job.url,
+            DOWNLOAD_PATH,
+            audio_only     = options["audio_only"],
+            resolution     = options["resolution"],
+            mp3            = options["mp3"],
+            metadata_cache = get_metadata_cache(),
+            job            = job.progress,
+            rate_limit     = job.rate_limit,
+            on_start       = on_start,
+            on_chunk       = on_chunk,
+        )
+        job.progress.set_status("Download complete.", progress.DONE)
+        LOG.info("Download complete.")
+    except jobs.Cancelled:
+        raise
+    except Exception as e:
+        job.progress.set_status("Download failed. Check the log for more info or try again to resume.", progress.FAILED)
+        LOG.error(f"Download failed: {e}")
+
 
+def download_playlist(job: "jobs.Job"):
+    options          = job.options
+    download_archive = None
+
+    try:
+        job.progress.set_status(f"{Icons.Spinner} Loading playlist...")
+        yt = get_metadata_cache().playlist(job.url)
+        playlist_path = downloader.playlist_folder(yt, DOWNLOAD_PATH)
         if not os.path.exists(playlist_path):
             os.makedirs(playlist_path)
 
-        if not audio_only:
-            for vid in yt.videos:
-                current_stream += 1
-                try:
-                    task_status = f"Getting video stream ({current_stream}/{len(yt.videos)})"
-                    LOG.info(f"({current_stream}/{len(yt.videos)}) Getting video stream...")
-                    if res_index > 0:
-                        stream = vid.streams.filter(
-                            res = RESOLUTIONS[res_index], 
-                            file_extension = 'mp4', 
-                            progressive = True
-                        ).first()
-                        streams.append(stream)
-                    else:
-                        stream = vid.streams.get_highest_resolution()
-                        streams.append(stream)
-                except Exception as e:
-                    task_status = "Unable to get video stream! Skipping this video."
-                    LOG.warning(f"({({current_stream}/{len(yt.videos)})}): Unable to get video stream! Skipping this video. Traceback: {e}")
-                    continue
+        download_archive = archive.DownloadArchive(DOWNLOAD_PATH)
+        engine           = downloader.PlaylistDownloader(
+            yt.video_urls,
+            playlist_path,
+            audio_only       = options["audio_only"],
+            resolution       = options["resolution"],
+            mp3              = options["mp3"],
+            workers          = options.get("workers", playlist_workers),
+            download_archive = download_archive,
+            metadata_cache   = get_metadata_cache(),
+            job              = job.progress,
+            rate_limit       = job.rate_limit,
+            total            = downloader.playlist_length(yt),
+        )
+        job.on_cancel = engine.cancel
+        job.check_cancelled()
+        job.progress.set_status("Downloading...")
+        LOG.info(f"Starting download with {engine.workers} workers...")
+        engine.run()
+        job.check_cancelled()
+
+        if engine.failed > 0:
+            job.progress.set_status(f"Download complete. {engine.failed} videos failed, check the log for more info.", progress.DONE)
         else:
-            for vid in yt.videos:
-                current_stream += 1
-                try:
-                    task_status = f"Getting audio stream ({current_stream}/{len(yt.videos)})"
-                    LOG.info(f"({current_stream}/{len(yt.videos)}) Getting audio stream...")
-                    stream = vid.streams.get_audio_only()
-                    streams.append(stream)
-                except Exception as e:
-                    task_status = "Unable to get audio stream! Skipping this video."
-                    LOG.warning(f"({({current_stream}/{len(yt.videos)})}): Unable to get audio stream! Skipping this video. Traceback: {e}")
-                    continue
-
-        LOG.info("Starting download...")
-        for stream in streams:
-            current_download += 1
-            LOG.info(f"({current_download}/{len(streams)}) Downloading...")
-            try:
-                current_filesize = stream.filesize
-                current_filepath = Path(os.path.abspath(playlist_path)) / Path(os.path.basename(stream.get_file_path(stream.default_filename)))
-                task_status = f"Downloading... ({current_download}/{len(streams)})"
-                with open(current_filepath, "wb") as f:
-                    for chunk in stream.iter_chunks(65536):
-                        f.write(chunk)
-                        progress_value += len(chunk)
-                        sleep(0.001)
-
-                if audio_only:
-                    old_file = str(current_filepath).replace(".m4a", ".mp3")
-                    if os.path.exists(old_file):
-                        os.remove(old_file)
-                    base, _ = os.path.splitext(current_filepath)
-                    os.rename(current_filepath, base + '.mp3')
-            except Exception:
-                task_status = "Download failed! Skipping this video."
-                LOG.warning(f"({current_download}/{len(streams)}): Download failed! Skipping this video.")
-                continue
-
-        task_status = "Download complete."
-        LOG.info("Download complete.")
-        sleep(3)
-        progress_value = 0
-        download_in_progress = False
-        task_status = "Ready."
+            job.progress.set_status("Download complete.", progress.DONE)
+        LOG.info(
+            f"Download complete. {engine.completed} downloaded, "
+            f"{engine.skipped} already in the archive, {engine.failed} failed."
+        )
+    except jobs.Cancelled:
+        raise
     except Exception as e:
-        task_status = "An error occured! Check the log for more details."
+        job.progress.set_status("An error occured! Check the log for more details.", progress.FAILED)
         LOG.error(f"Failed to download YouTube Playlist! Traceback: {e}")
-        sleep(2)
-        task_status = "Ready."
-        download_in_progress = False
+    finally:
+        if download_archive is not None:
+            download_archive.close()
+
+
+def draw_queue_view(font):
+    global parallel_jobs
+    with imgui.begin_child("##queue", 0, 390, True):
+        imgui.text(f"{Icons.Queue} Download queue")
+        imgui.same_line(spacing=20)
+        imgui.set_next_item_width(100)
+        changed, parallel_jobs = imgui.slider_int("Parallel", parallel_jobs, 1, MAX_PARALLEL)
+        if changed:
+            job_queue.set_max_running(parallel_jobs)
+        tooltip("Number of links downloaded at the same time.", None, 0.8)
+        imgui.same_line(spacing=10)
+        if imgui.button(f"{Icons.Close} Clear finished"):
+            job_queue.clear_finished()
+        imgui.separator()
+
+        queued = job_queue.jobs()
+        if not queued:
+            imgui.text_disabled("Nothing queued. Look up a link and press Download to add it here.")
+        for job in queued:
+            snapshot = job_snapshot(job)
+            imgui.push_id(str(job.job_id))
+            if job.state == progress.QUEUED:
+                if imgui.small_button(Icons.ArrowUp):
+                    job_queue.set_priority(job.job_id, min(job.priority + 1, jobs.HIGH))
+                imgui.same_line()
+                if imgui.small_button(Icons.ArrowDown):
+                    job_queue.set_priority(job.job_id, max(job.priority - 1, jobs.LOW))
+                imgui.same_line()
+            if imgui.small_button(Icons.Close):
+                if job.state in (progress.QUEUED, progress.RUNNING):
+                    job_queue.cancel(job.job_id)
+                else:
+                    job_queue.remove(job.job_id)
+            tooltip("Cancel" if job.state in (progress.QUEUED, progress.RUNNING) else "Remove from the list", font)
+            imgui.same_line()
+            imgui.text(job.title)
+            with imgui.font(font):
+                imgui.text_disabled(f"{jobs.PRIORITY_NAMES.get(job.priority, job.priority)} priority. {job_status_text(snapshot)}")
+            if job.state in (progress.QUEUED, progress.RUNNING):
+                job_speed_limit_slider(job)
+            if snapshot["state"] == progress.RUNNING and snapshot["bytes_total"] > 0:
+                imgui.progress_bar(snapshot["progress"], (-1, 4))
+                if snapshot["kind"] == "playlist":
+                    playlist_progress_tooltip(snapshot, font)
+            imgui.pop_id()
+            imgui.separator()
 
 
-def update_progress_bar():
-    global progress_value, current_filesize, current_filepath
-    while os.path.exists(current_filepath) and progress_value < current_filesize:
-        progress_value = os.path.getsize(current_filepath)
-        sleep(0.01)
+def format_seconds(seconds: float) -> str:
+    return f"{seconds * 1000:.0f} ms" if seconds < 1 else f"{seconds:.1f} s"
 
 
-@execute_once
-def progress_bar_thread():
-    Thread(target = update_progress_bar, daemon = True).start()
+def metric_total(metric: "metrics.Counter") -> float:
+    return sum(entry["value"] for entry in metric.snapshot())
+
+
+def draw_stats_view(font):
+    global task_status
+    with imgui.begin_child("##stats", 0, 390, True):
+        imgui.text(f"{Icons.Stats} Performance")
+        imgui.same_line(spacing=20)
+        if imgui.button(f"{Icons.Download} Export"):
+            metrics_exporter.export()
+            task_status = f"Metrics saved to {METRICS_PATH}."
+        tooltip("Saves the metrics as JSON and in the Prometheus text format. They're also saved every few seconds.", None, 0.8)
+        imgui.separator()
+
+        imgui.columns(5, "##stages", False)
+        imgui.set_column_width(0, 180)
+        for header in ("Stage", "Count", "Average", "p50", "p95"):
+            imgui.text_disabled(header)
+            imgui.next_column()
+        for stage in metrics.STAGES:
+            summary = metrics.STAGE_SECONDS.summary(stage = stage)
+            imgui.text(STAGE_NAMES[stage])
+            imgui.next_column()
+            imgui.text(str(summary["count"]))
+            imgui.next_column()
+            for key in ("avg", "p50", "p95"):
+                imgui.text(format_seconds(summary[key]) if summary["count"] else "-")
+                imgui.next_column()
+        imgui.columns(1)
+        imgui.separator()
+
+        speed = metrics.TRANSFER_SPEED.summary()
+        items = {entry["labels"].get("state"): entry["value"] for entry in metrics.ITEMS.snapshot()}
+        depth = {entry["labels"].get("queue"): entry["value"] for entry in metrics.QUEUE_DEPTH.snapshot()}
+        imgui.text(f"Downloaded: {metric_total(metrics.BYTES) / 1024 ** 2:,.1f} MB")
+        if speed["count"]:
+            imgui.same_line(spacing=20)
+            imgui.text(f"Speed: {speed['p50'] / 1024 ** 2:.1f} MB/s median, {speed['avg'] / 1024 ** 2:.1f} MB/s average")
+        imgui.text(f"Videos: {items.get('done', 0)} done, {items.get('skipped', 0)} skipped, {items.get('failed', 0)} failed")
+        imgui.text(f"Retries: {metric_total(metrics.RETRIES):.0f}")
+        imgui.text(f"Waiting: {depth.get('jobs', 0)} links, {depth.get('resolve', 0)} to resolve, {depth.get('download', 0)} to download")
+        with imgui.font(font):
+            imgui.text_disabled("Times are since the app started. Slow URL resolution points at YouTube, slow transfers at bandwidth and slow post-processing at the disk or CPU.")
 
 
 def OnDraw():
@@ -499,19 +652,20 @@ def OnDraw():
     global video_link
     global is_available
     global audio_only
-    global current_filesize
-    global current_filepath
-    global download_in_progress
+    global playlist_workers
+    global show_queue
+    global show_stats
 
     imgui.create_context()
     window, text_cursor, hand_cursor = gui.new_window("YouTube Downloader", 640, 480, False)
     impl = GlfwRenderer(window)
+    STARTUP.mark("Window created")
     font_scaling_factor = gui.fb_to_window_factor(window)
     io = imgui.get_io()
     io.fonts.clear()
     io.font_global_scale = 1.0 / font_scaling_factor
     font_config = imgui.core.FontConfig(merge_mode = True)
-    icons_range = imgui.core.GlyphRanges([0xF001, 0xF002, 0xF006, 0xF007, 0xF00D, 0xF00E, 0xF013, 0xF019, 0xF06E, 0xF073, 0xF07C, 0xF09B, 0xF110, 0xF167, 0])
+    icons_range = imgui.core.GlyphRanges([0xF001, 0xF002, 0xF006, 0xF007, 0xF00D, 0xF00E, 0xF013, 0xF019, 0xF062, 0xF063, 0xF06E, 0xF073, 0xF07C, 0xF09B, 0xF0CA, 0xF0CA, 0xF110, 0xF167, 0])
     
     title_font = io.fonts.add_font_from_file_ttf(
         str(res_path("fonts/Rokkitt-Regular.ttf")), 25 * font_scaling_factor,
@@ -531,29 +685,41 @@ def OnDraw():
     )
 
     impl.refresh_font_texture()
-    thumb_texture, _, _ = gui.draw_image(res_path("img/ytd_splash.png"))
+    STARTUP.mark("Fonts loaded")
+    gui.apply_style(
+        {
+            imgui.COLOR_FRAME_BACKGROUND: (0.1, 0.1, 0.1),
+            imgui.COLOR_FRAME_BACKGROUND_ACTIVE: (0.3, 0.3, 0.3),
+            imgui.COLOR_FRAME_BACKGROUND_HOVERED: (0.5, 0.5, 0.5),
+            imgui.COLOR_HEADER: (0.1, 0.1, 0.1),
+            imgui.COLOR_HEADER_ACTIVE: (0.3, 0.3, 0.3),
+            imgui.COLOR_HEADER_HOVERED: (0.5, 0.5, 0.5),
+            imgui.COLOR_BUTTON: (1.0, 0.0, 0.0),
+            imgui.COLOR_BUTTON_ACTIVE: (0.85, 0.0, 0.0),
+            imgui.COLOR_BUTTON_HOVERED: (0.75, 0.0, 0.0),
+        },
+        {
+            "child_rounding": 5,
+            "frame_rounding": 5,
+            "item_spacing": (5, 5),
+            "item_inner_spacing": (10, 10),
+            "frame_padding": (6, 6),
+        }
+    )
+    progress_bus.subscribe(on_job_progress)
+    job_queue.start()
+    metrics_exporter.start()
+    first_frame = True
 
     while not gui.glfw.window_should_close(window):
-        gui.glfw.poll_events()
+        running = running_snapshots()
+        scheduler.active = bool(running) or bool(video_info_thread and not video_info_thread.done())
+        scheduler.wait(window)
         impl.process_inputs()
         imgui.new_frame()
         win_w, win_h = gui.glfw.get_window_size(window)
         imgui.set_next_window_size(win_w, win_h)
         imgui.set_next_window_position(0, 0)
-        imgui.push_style_color(imgui.COLOR_FRAME_BACKGROUND, 0.1, 0.1, 0.1)
-        imgui.push_style_color(imgui.COLOR_FRAME_BACKGROUND_ACTIVE, 0.3, 0.3, 0.3)
-        imgui.push_style_color(imgui.COLOR_FRAME_BACKGROUND_HOVERED, 0.5, 0.5, 0.5)
-        imgui.push_style_color(imgui.COLOR_HEADER, 0.1, 0.1, 0.1)
-        imgui.push_style_color(imgui.COLOR_HEADER_ACTIVE, 0.3, 0.3, 0.3)
-        imgui.push_style_color(imgui.COLOR_HEADER_HOVERED, 0.5, 0.5, 0.5)
-        imgui.push_style_color(imgui.COLOR_BUTTON, 1.0, 0.0, 0.0)
-        imgui.push_style_color(imgui.COLOR_BUTTON_ACTIVE, 0.85, 0.0, 0.0)
-        imgui.push_style_color(imgui.COLOR_BUTTON_HOVERED, 0.75, 0.0, 0.0)
-        imgui.push_style_var(imgui.STYLE_CHILD_ROUNDING, 5)
-        imgui.push_style_var(imgui.STYLE_FRAME_ROUNDING, 5)
-        imgui.push_style_var(imgui.STYLE_ITEM_SPACING, (5, 5))
-        imgui.push_style_var(imgui.STYLE_ITEM_INNER_SPACING, (10, 10))
-        imgui.push_style_var(imgui.STYLE_FRAME_PADDING, (6, 6))
         imgui.begin("Main Window", flags =
                     imgui.WINDOW_NO_TITLE_BAR |
                     imgui.WINDOW_NO_RESIZE |
@@ -561,86 +727,96 @@ def OnDraw():
                     )
         imgui.push_font(main_font)
 
-        with imgui.begin_child("##main", 0, 390, True):
-            imgui.push_text_wrap_pos(620)
-            imgui.set_next_item_width(560)
-            link_entered, video_link = imgui.input_text_with_hint(
-                "##ytlink", "Enter a YouTube video link", video_link, 128,
-                flags = imgui.INPUT_TEXT_CHARS_NO_BLANK | imgui.INPUT_TEXT_ENTER_RETURNS_TRUE
-            )
-            set_cursor(window, text_cursor)
-            imgui.same_line()
-            search_button_pressed = colored_button(f"  {Icons.Search}  ", [0.1, 0.1, 0.1], [0.2, 0.2, 0.2], [0.3, 0.3, 0.3])
-            if len(video_link) > 0 and (link_entered or search_button_pressed):
-                clear_info_table()
-                run_video_info()
-            imgui.dummy(1, 15)
-            if is_valid_title():
-                if thumb_downloaded:
-                    with imgui.begin_child("##thumbnail", 320, 220, True):
-                        thumb_texture, _, _ = gui.draw_image(Path(THUMBNAIL_PATH) / "temp.jpg")
-                        imgui.image(thumb_texture, 300, 200)
-                    imgui.same_line()
-
-                with imgui.begin_child("##vid_info", -1, 220, False):
-                    imgui.push_text_wrap_pos(290)
-                    imgui.dummy(1, 10)
-                    with imgui.font(title_font):
-                        imgui.text(video_info["title"])
+        if show_queue:
+            draw_queue_view(small_font)
+        elif show_stats:
+            draw_stats_view(small_font)
+        else:
+            with imgui.begin_child("##main", 0, 390, True):
+                imgui.push_text_wrap_pos(620)
+                imgui.set_next_item_width(560)
+                link_entered, video_link = imgui.input_text_with_hint(
+                    "##ytlink", "Enter a YouTube video link", video_link, 128,
+                    flags = imgui.INPUT_TEXT_CHARS_NO_BLANK | imgui.INPUT_TEXT_ENTER_RETURNS_TRUE
+                )
+                set_cursor(window, text_cursor)
+                imgui.same_line()
+                search_button_pressed = colored_button(f"  {Icons.Search}  ", [0.1, 0.1, 0.1], [0.2, 0.2, 0.2], [0.3, 0.3, 0.3])
+                if len(video_link) > 0 and (link_entered or search_button_pressed):
+                    clear_info_table()
+                    run_video_info()
+                imgui.dummy(1, 15)
+                if is_valid_title():
+                    if thumbnail:
+                        with imgui.begin_child("##thumbnail", 320, 220, True):
+                            thumb_key, thumb_image = thumbnail
+                            thumb_texture, _, _ = texture_cache.get(thumb_key, thumb_image)
+                            imgui.image(thumb_texture, *THUMBNAIL_SIZE)
+                        imgui.same_line()
+
+                    with imgui.begin_child("##vid_info", -1, 220, False):
+                        imgui.push_text_wrap_pos(290)
+                        imgui.dummy(1, 10)
+                        with imgui.font(title_font):
+                            imgui.text(video_info["title"])
+                            set_cursor(window, hand_cursor)
+                            if imgui.is_item_hovered() and imgui.is_mouse_clicked(0):
+                                webbrowser.open(video_link)
+
+                        imgui.dummy(1, 12)
+                        imgui.text(f"{Icons.User} {video_info["channel_name"]}")
                         set_cursor(window, hand_cursor)
                         if imgui.is_item_hovered() and imgui.is_mouse_clicked(0):
-                            webbrowser.open(video_link)
-
-                    imgui.dummy(1, 12)
-                    imgui.text(f"{Icons.User} {video_info["channel_name"]}")
-                    set_cursor(window, hand_cursor)
-                    if imgui.is_item_hovered() and imgui.is_mouse_clicked(0):
-                        webbrowser.open(video_info["channel_url"])
-                    imgui.text(f"{Icons.Views} {video_info["views"]} views.")
-                    if not is_playlist:
-                        imgui.text(f"{Icons.Calendar} {video_info["date"]}")
-                    else:
-                        imgui.text(f"{Icons.YouTube} {video_info["video_count"]} videos.")
-                    imgui.pop_text_wrap_pos()
-                if video_info_thread and video_info_thread.done():
-                    imgui.dummy(1, 5)
-                    _, audio_only = imgui.checkbox("Audio Only", audio_only)
-                    imgui.same_line(spacing=10)
-                    imgui.set_next_item_width(200)
-                    if not audio_only:
-                        _, res_index = imgui.combo("Video Resolution", res_index, RESOLUTIONS)
-                        tooltip("It's recommended to keep this on 'Auto'.", None, 0.8)
-                    else:
-                        _, fmt_index = imgui.combo("Audio Format", fmt_index, AUDIO_FORMATS)
-                    imgui.dummy(1, 5)
-                    download_label = " Download" if not is_playlist else " Download Playlist"
-                    if not download_in_progress:
+                            webbrowser.open(video_info["channel_url"])
+                        imgui.text(f"{Icons.Views} {video_info["views"]} views.")
+                        if not is_playlist:
+                            imgui.text(f"{Icons.Calendar} {video_info["date"]}")
+                        else:
+                            imgui.text(f"{Icons.YouTube} {video_info["video_count"]} videos.")
+                            playlist_tooltip(small_font)
+                        imgui.pop_text_wrap_pos()
+                    if video_info_thread and video_info_thread.done():
+                        imgui.dummy(1, 5)
+                        _, audio_only = imgui.checkbox("Audio Only", audio_only)
+                        imgui.same_line(spacing=10)
+                        imgui.set_next_item_width(200)
+                        if not audio_only:
+                            _, res_index = imgui.combo("Video Resolution", res_index, RESOLUTIONS)
+                            tooltip("It's recommended to keep this on 'Auto'.", None, 0.8)
+                        else:
+                            _, fmt_index = imgui.combo("Audio Format", fmt_index, AUDIO_FORMATS)
+                        imgui.dummy(1, 5)
+                        download_label = " Download" if not is_playlist else " Download Playlist"
                         if imgui.button(Icons.Download + download_label):
-                            task_status = f"{Icons.Spinner} Starting download..."
-                            Thread(target = download_video if not is_playlist else download_playlist, daemon = True).start()
+                            enqueue_download()
+                        tooltip("Adds the link to the download queue.", None, 0.8)
                         imgui.same_line(spacing=10)
                         if imgui.button(f"{Icons.Close} Clear"):
+                            cancel_playlist_loader()
                             clear_info_table()
-                            remove_thumbnails_folder()
+                            clear_thumbnail()
+                            texture_cache.clear()
                             video_link = ""
                             task_status = "Idle."
-                    else:
-                        imgui.button(Icons.Spinner)
-
-            imgui.pop_text_wrap_pos()
+                        if is_playlist:
+                            imgui.same_line(spacing=10)
+                            imgui.set_next_item_width(100)
+                            _, playlist_workers = imgui.slider_int("Workers", playlist_workers, 1, downloader.MAX_WORKERS)
+                            tooltip("Number of videos downloaded at the same time.", None, 0.8)
+                        speed_limit_slider()
+
+                imgui.pop_text_wrap_pos()
         with imgui.begin_child("##status", -1, 40):
             imgui.push_text_wrap_pos(win_w - 5)
-            imgui.text(f"Status: {task_status}")
+            imgui.text(f"Status: {status_text(running)}")
             imgui.pop_text_wrap_pos()
 
-            if download_in_progress:
-                if current_filesize > 0:
-                    prgrs = progress_value / current_filesize
-                    if is_playlist:
-                        prgrs = prgrs / video_info["video_count"]
-                    imgui.progress_bar(prgrs, (620, 5))
+            if running:
+                imgui.progress_bar(sum(snapshot["progress"] for snapshot in running) / len(running), (620, 5))
+                if len(running) == 1 and running[0]["kind"] == "playlist":
+                    playlist_progress_tooltip(running[0], small_font)
 
-        imgui.dummy(win_w / 2 - 40, 1)
+        imgui.dummy(win_w / 2 - 75, 1)
         imgui.same_line()
         imgui.text(Icons.Folder)
         tooltip("Click to open the downloads folder", small_font, 0.75)
@@ -648,14 +824,30 @@ def OnDraw():
         if imgui.is_item_hovered() and imgui.is_item_clicked():
             open_downloads_folder()
         imgui.same_line(spacing=20)
+        imgui.text(Icons.Queue)
+        tooltip("Click to show the download queue", small_font, 0.75)
+        set_cursor(window, hand_cursor)
+        if imgui.is_item_hovered() and imgui.is_item_clicked():
+            show_queue = not show_queue
+            show_stats = False
+        imgui.same_line(spacing=20)
+        imgui.text(Icons.Stats)
+        tooltip("Click to show performance stats", small_font, 0.75)
+        set_cursor(window, hand_cursor)
+        if imgui.is_item_hovered() and imgui.is_item_clicked():
+            show_stats = not show_stats
+            show_queue = False
+        imgui.same_line(spacing=20)
         imgui.text(Icons.GitHub)
         tooltip("Click to visit the GitHub repo", small_font, 0.75)
         set_cursor(window, hand_cursor)
         if imgui.is_item_hovered() and imgui.is_item_clicked():
             webbrowser.open("https://github.com/xesdoog/YouTube-Downloader-V2")
+        imgui.same_line(win_w - 110)
+        with imgui.font(small_font):
+            imgui.text_disabled(f"{scheduler.frame_rate:.0f} fps {scheduler.frame_ms:.1f} ms")
+        tooltip("Frames drawn per second and time spent drawing each frame.", small_font, 0.75)
         imgui.pop_font()
-        imgui.pop_style_color(9)
-        imgui.pop_style_var(5)
         imgui.end()
 
         gui.gl.glClearColor(1.0, 1.0, 1.0, 1)
@@ -665,8 +857,19 @@ def OnDraw():
             reset_cursor(window)
         impl.render(imgui.get_draw_data())
         gui.glfw.swap_buffers(window)
-        gui.gl.glDeleteTextures([thumb_texture])
-
+        scheduler.frame_done()
+
+        if first_frame:
+            first_frame = False
+            STARTUP.mark("First frame")
+            LOG.info(STARTUP.report())
+            gui.set_window_icon(window)
+            Thread(target = warm_up, daemon = True).start()
+
+    job_queue.stop()
+    metrics_exporter.stop()
+    cancel_playlist_loader()
+    texture_cache.clear()
     impl.shutdown()
     gui.glfw.terminate()
 
@@ -674,7 +877,6 @@ def OnDraw():
 @atexit.register
 def OnExit():
     LOG.info("Closing application...\n\nFarewell!\n")
-    remove_thumbnails_folder()
 
 if __name__ == "__main__":
     if getattr(sys, 'frozen', False):
@@ -0,0 +1,86 @@
+import os
+import sqlite3
+
+from pathlib   import Path
+from src       import utils
+from threading import Lock
+from time      import time
+
+LOG              = utils.LOGGER()
+ARCHIVE_FILENAME = ".ytd_archive.sqlite3"
+
+
+def format_key(audio_only: bool, resolution: str = None, mp3: bool = False) -> str:
+    """
+    Identifies the format a video was downloaded in, so the same video
+    downloaded at a different resolution isn't treated as a duplicate.
+    """
+    if audio_only:
+        return "mp3" if mp3 else "m4a"
+    return f"mp4-{resolution or 'auto'}"
+
+
+class DownloadArchive:
+    """
+    Persistent index of finished downloads stored in the download folder.
+    Maps (video id, format) to the output path, size and completion time.
+
+    The whole index is loaded in memory when opened so lookups are O(1)
+    dict hits, SQLite is only used to persist it.
+    """
+    def __init__(self, folder):
+        self.path  = Path(folder) / ARCHIVE_FILENAME
+        self._lock = Lock()
+        os.makedirs(folder, exist_ok = True)
+        self._db = sqlite3.connect(self.path, check_same_thread = False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS downloads (
+                video_id     TEXT NOT NULL,
+                format       TEXT NOT NULL,
+                path         TEXT NOT NULL,
+                size         INTEGER NOT NULL,
+                completed_at REAL NOT NULL,
+                PRIMARY KEY (video_id, format)
+            ) WITHOUT ROWID
+            """
+        )
+        self._db.commit()
+        self._index = {
+            (video_id, fmt): (path, size)
+            for video_id, fmt, path, size in self._db.execute("SELECT video_id, format, path, size FROM downloads")
+        }
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def get(self, video_id: str, fmt: str):
+        return self._index.get((video_id, fmt))
+
+    def contains(self, video_id: str, fmt: str) -> bool:
+        """
+        True if the video was already downloaded in this format and the file
+        is still on disk with the recorded size.
+        """
+        entry = self._index.get((video_id, fmt))
+        if not entry:
+            return False
+        path, size = entry
+        try:
+            return os.path.getsize(path) == size
+        except OSError:
+            return False
+
+    def add(self, video_id: str, fmt: str, path, size: int):
+        with self._lock:
+            self._index[(video_id, fmt)] = (str(path), size)
+            self._db.execute(
+                "INSERT OR REPLACE INTO downloads VALUES (?, ?, ?, ?, ?)",
+                (video_id, fmt, str(path), size, time())
+            )
+            self._db.commit()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
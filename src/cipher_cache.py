@@ -0,0 +1,202 @@
+import atexit
+import pytubefix
+import re
+
+from collections      import OrderedDict
+from pytubefix        import extract
+from pytubefix.cipher import Cipher
+from src              import metadata, utils
+from threading        import Lock
+
+LOG         = utils.LOGGER()
+PLAYER_TTL  = 7 * 24 * 3600
+MAX_CIPHERS = 2
+
+
+def player_version(js_url: str) -> str:
+    """
+    The player id in a base.js url, e.g. ".../s/player/f4d92f0b/..." -> "f4d92f0b".
+    Falls back to the whole url.
+    """
+    match = re.search(r"/player/([\w-]+)/", js_url or "")
+    return match.group(1) if match else js_url
+
+
+class PlayerCache:
+    """
+    Decipher function names and parameters found in each player version,
+    held in memory and persisted in `cache_dir` when set. The last player
+    JS is saved too, so a new session doesn't download it again.
+    """
+    def __init__(self, cache_dir = None):
+        self.store    = metadata.DiskStore(cache_dir, PLAYER_TTL) if cache_dir else None
+        self._entries = {}
+        self._lock    = Lock()
+
+    def get(self, js_url: str) -> dict:
+        version = player_version(js_url)
+        with self._lock:
+            entry = self._entries.get(version)
+        if entry is None and self.store:
+            entry = self.store.get("cipher", version)
+            if entry:
+                with self._lock:
+                    self._entries[version] = entry
+        return entry
+
+    def set(self, js_url: str, entry: dict):
+        version = player_version(js_url)
+        with self._lock:
+            self._entries[version] = entry
+        if self.store:
+            self.store.set("cipher", version, entry)
+
+    def save_player(self, js_url: str, js: str):
+        if self.store:
+            self.store.set("player", "latest", {"js_url": js_url, "js": js})
+
+    def load_player(self):
+        """
+        Puts the last saved player JS in pytubefix's module cache, unless
+        a player was already loaded in this session.
+        """
+        if pytubefix.__js__ or not self.store:
+            return
+        player = self.store.get("player", "latest")
+        if player:
+            pytubefix.__js_url__ = player["js_url"]
+            pytubefix.__js__     = player["js"]
+            LOG.info(f"Loaded player {player_version(player['js_url'])} from the cache.")
+
+
+PLAYERS = PlayerCache()
+
+
+class CachedCipher(Cipher):
+    """
+    `Cipher` that looks up the decipher functions of known player versions
+    in `PLAYERS` instead of searching base.js for them on every video.
+    """
+    def get_sig_function_name(self, js: str, js_url: str) -> str:
+        self._cached = PLAYERS.get(js_url)
+        if self._cached:
+            self._sig_param_val = self._cached["sig_param"]
+            return self._cached["sig_name"]
+        return super().get_sig_function_name(js, js_url)
+
+    def get_nsig_function_name(self, js: str, js_url: str):
+        if self._cached:
+            self._nsig_param_val = self._cached["nsig_param"]
+            return self._cached["nsig_name"]
+
+        name = super().get_nsig_function_name(js, js_url)
+        LOG.info(f"Found the decipher functions of player {player_version(js_url)}.")
+        self._cached = {
+            "sig_name": self.sig_function_name,
+            "sig_param": self._sig_param_val,
+            "nsig_name": name,
+            "nsig_param": self._nsig_param_val,
+        }
+        PLAYERS.set(js_url, self._cached)
+        PLAYERS.save_player(js_url, js)
+        return name
+
+    def get_nsig(self, n: str):
+        nsig = super().get_nsig(n)
+        # the n parameters may have been narrowed down to the working ones.
+        if self._cached and self._nsig_param_val != self._cached["nsig_param"]:
+            self._cached = {**self._cached, "nsig_param": self._nsig_param_val}
+            PLAYERS.set(self.js_url, self._cached)
+        return nsig
+
+
+class KeptRunner:
+    """
+    Wraps a pytubefix `NodeRunner` so the `close()` at the end of
+    `apply_signature` keeps its node process running for the next video.
+    `shutdown()` stops it.
+    """
+    def __init__(self, runner):
+        self._runner = runner
+
+    def __getattr__(self, name):
+        return getattr(self._runner, name)
+
+    def close(self):
+        pass
+
+    def shutdown(self):
+        self._runner.close()
+
+
+class CipherPool:
+    """
+    One `CachedCipher` per player version, so its node processes and JS
+    interpreter are set up once instead of for every video. The last
+    `MAX_CIPHERS` players are kept, older ones are shut down.
+    """
+    def __init__(self, size: int = MAX_CIPHERS):
+        self.size     = size
+        self._ciphers = OrderedDict()
+        self._lock    = Lock()
+
+    def get(self, js: str, js_url: str) -> CachedCipher:
+        version = player_version(js_url)
+        with self._lock:
+            cipher = self._ciphers.get(version)
+            if cipher:
+                self._ciphers.move_to_end(version)
+                return cipher
+
+        cipher             = CachedCipher(js, js_url)
+        cipher.runner_sig  = KeptRunner(cipher.runner_sig)
+        cipher.runner_nsig = KeptRunner(cipher.runner_nsig)
+        with self._lock:
+            self._ciphers[version] = cipher
+            evicted = [self._ciphers.popitem(last = False)[1] for _ in range(len(self._ciphers) - self.size)]
+        for old in evicted:
+            self._shutdown(old)
+        return cipher
+
+    def close(self):
+        with self._lock:
+            ciphers = list(self._ciphers.values())
+            self._ciphers.clear()
+        for cipher in ciphers:
+            self._shutdown(cipher)
+
+    @staticmethod
+    def _shutdown(cipher: CachedCipher):
+        try:
+            cipher.runner_sig.shutdown()
+        finally:
+            cipher.runner_nsig.shutdown()
+
+
+CIPHERS          = CipherPool()
+_apply_signature = extract.apply_signature
+_signature_lock  = Lock()
+
+
+def apply_signature(stream_manifest, vid_info, js: str, url_js: str):
+    """
+    `extract.apply_signature` on the shared cipher of the player. The node
+    processes answer one call at a time, so videos are signed one by one.
+    """
+    with _signature_lock:
+        _apply_signature(stream_manifest, vid_info, js, url_js)
+
+
+def install(cache_dir = None):
+    """
+    Makes pytubefix use `CachedCipher`, persisting players in `cache_dir`,
+    and share one cipher per player version between videos.
+    """
+    global PLAYERS
+    if cache_dir and not PLAYERS.store:
+        PLAYERS = PlayerCache(cache_dir)
+    PLAYERS.load_player()
+    if extract.apply_signature is not apply_signature:
+        extract.Cipher          = CIPHERS.get
+        extract.apply_signature = apply_signature
+        atexit.register(CIPHERS.close)
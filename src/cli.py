@@ -0,0 +1,230 @@
+"""
+Headless command line mode. Downloads videos and playlists without opening a
+window and prints progress to stdout as JSON lines, one event per line.
+
+    python -m src.cli [URL ...] [-i urls.txt] [-o ./YTDownloads] [-r 720p] [-a] [-j 4] [--limit-rate 2M]
+
+Only the download logic is imported here, none of the GUI stack, so it can
+run on headless hosts.
+"""
+import argparse
+import json
+import sys
+
+from concurrent.futures import ThreadPoolExecutor
+from src                import archive, cipher_cache, diskwriter, downloader, metadata, metrics, network, progress, ratelimit, resolver, urls, utils
+from threading          import Lock
+from time               import time
+
+LOG               = utils.LOGGER()
+DOWNLOAD_PATH     = './YTDownloads'
+CACHE_PATH        = './.ytd_cache'
+PROGRESS_INTERVAL = 0.5
+RESOLUTIONS       = ["Auto", "144p", "240p", "360p", "480p", "720p", "1080p", "1440p", "2160p"]
+
+
+class JsonReporter:
+    """
+    Writes one JSON object per line to `stream`. Subscribed to a
+    `progress.ProgressBus` with `on_job`, it prints the progress of running
+    jobs from their snapshots, as often as the bus delivers them.
+    """
+    def __init__(self, stream = sys.stdout):
+        self.stream = stream
+        self._lock  = Lock()
+
+    def emit(self, event: str, **fields):
+        line = json.dumps({"event": event, "time": round(time(), 3), **fields}, default = str)
+        with self._lock:
+            self.stream.write(line + "\n")
+            self.stream.flush()
+
+    def on_job(self, snapshot: dict):
+        if snapshot["state"] != progress.RUNNING:
+            return
+        fields = {"bytes": snapshot["bytes_done"], "total": snapshot["bytes_total"], "progress": round(snapshot["progress"], 4)}
+        if snapshot["kind"] == "playlist":
+            fields.update(items_done = snapshot["items_done"], items_failed = snapshot["items_failed"], items_total = snapshot["items_total"])
+        self.emit("progress", url = snapshot["title"], **fields)
+
+
+def read_urls(args) -> list[str]:
+    links = list(args.urls)
+    if args.input:
+        with open(args.input, "r", encoding = "utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith("#"):
+                    links.append(line)
+    return links
+
+
+def job_rate_limit(args) -> ratelimit.TokenBucket:
+    return ratelimit.LIMITER.job_bucket(args.job_limit_rate) if args.job_limit_rate else None
+
+
+def download_video(url: str, args, reporter: JsonReporter, cache: metadata.MetadataCache, bus: progress.ProgressBus) -> bool:
+    job = bus.create_job(url)
+
+    def on_start(stream, filepath, filesize):
+        reporter.emit("start", url = url, title = stream.title, path = filepath, total = filesize)
+
+    try:
+        job.set_status("Downloading...", progress.RUNNING)
+        path = downloader.download_video(
+            url,
+            args.output,
+            audio_only     = args.audio_only,
+            resolution     = args.resolution,
+            mp3            = args.audio_only and args.format == "mp3",
+            segments       = args.segments,
+            metadata_cache = cache,
+            rate_limit     = job_rate_limit(args),
+            job            = job,
+            on_start       = on_start,
+        )
+        job.set_status("Download complete.", progress.DONE)
+        reporter.emit("done", url = url, path = path)
+        return True
+    except Exception as e:
+        LOG.error(f"Download failed: {e}")
+        job.set_status("Download failed.", progress.FAILED)
+        reporter.emit("error", url = url, message = str(e))
+        return False
+    finally:
+        bus.remove_job(job.job_id)
+
+
+def download_playlist(url: str, args, reporter: JsonReporter, cache: metadata.MetadataCache, bus: progress.ProgressBus) -> bool:
+    job              = bus.create_job(url, "playlist")
+    download_archive = None
+    stream_resolver  = None
+    try:
+        job.set_status("Loading playlist...", progress.RUNNING)
+        playlist      = cache.playlist(url)
+        playlist_path = downloader.playlist_folder(playlist, args.output)
+        if not args.no_archive:
+            download_archive = archive.DownloadArchive(args.output)
+        if args.resolve_processes:
+            stream_resolver = resolver.ProcessResolver(args.resolve_processes, None if args.no_cache else CACHE_PATH)
+
+        engine = downloader.PlaylistDownloader(
+            playlist.video_urls,
+            playlist_path,
+            audio_only       = args.audio_only,
+            resolution       = args.resolution,
+            mp3              = args.audio_only and args.format == "mp3",
+            workers          = args.jobs,
+            download_archive = download_archive,
+            metadata_cache   = cache,
+            job              = job,
+            rate_limit       = job_rate_limit(args),
+            total            = downloader.playlist_length(playlist),
+            stream_resolver  = stream_resolver,
+        )
+        reporter.emit("playlist", url = url, title = playlist.title, path = playlist_path, count = engine.total)
+
+        def on_item_done(item: downloader.DownloadItem):
+            if item.status in ("Done", "Skipped"):
+                reporter.emit("done", url = item.url, title = item.title, path = item.path, status = item.status.lower(), playlist = url)
+            else:
+                reporter.emit("error", url = item.url, title = item.title, message = item.status, playlist = url)
+
+        job.set_status("Downloading...")
+        engine.run(on_item_done)
+        job.set_status("Download complete.", progress.DONE)
+        reporter.emit(
+            "playlist_done", url = url,
+            completed = engine.completed, skipped = engine.skipped, failed = engine.failed, cancelled = engine.stopped
+        )
+        return engine.failed == 0
+    except Exception as e:
+        LOG.error(f"Failed to download YouTube Playlist! Traceback: {e}")
+        job.set_status("Download failed.", progress.FAILED)
+        reporter.emit("error", url = url, message = str(e))
+        return False
+    finally:
+        bus.remove_job(job.job_id)
+        if download_archive is not None:
+            download_archive.close()
+        if stream_resolver:
+            stream_resolver.close()
+
+
+def parse_args(argv = None):
+    parser = argparse.ArgumentParser(prog = "ytd", description = "Download YouTube videos and playlists without the GUI.")
+    parser.add_argument("urls", nargs = "*", help = "video or playlist links")
+    parser.add_argument("-i", "--input", help = "file with one link per line, lines starting with # are ignored")
+    parser.add_argument("-o", "--output", default = DOWNLOAD_PATH, help = "download folder (default: %(default)s)")
+    parser.add_argument("-r", "--resolution", default = "Auto", choices = RESOLUTIONS, help = "video resolution (default: %(default)s)")
+    parser.add_argument("-a", "--audio-only", action = "store_true", help = "download the audio stream only")
+    parser.add_argument("-f", "--format", default = "mp3", choices = ["mp3", "m4a"], help = "audio format (default: %(default)s)")
+    parser.add_argument("-j", "--jobs", type = int, default = 4, help = "videos downloaded at the same time (default: %(default)s)")
+    parser.add_argument("-s", "--segments", type = int, default = downloader.SEGMENTS, help = "connections per video (default: %(default)s)")
+    parser.add_argument("-p", "--resolve-processes", type = int, default = 0, help = "resolve playlist streams on this many processes, 0 to use threads (default: %(default)s)")
+    parser.add_argument("--limit-rate", type = ratelimit.parse_rate, default = 0, help = "total download speed cap, e.g. 500K or 2M (default: no limit)")
+    parser.add_argument("--job-limit-rate", type = ratelimit.parse_rate, default = 0, help = "speed cap for each video or playlist (default: no limit)")
+    parser.add_argument("--no-archive", action = "store_true", help = "download playlist videos even if they're in the download archive")
+    parser.add_argument("--no-cache", action = "store_true", help = f"don't persist metadata and player ciphers to {CACHE_PATH}")
+    parser.add_argument("--chunk-size", type = ratelimit.parse_rate, help = f"bytes read from the network at a time, e.g. 256K (default: {diskwriter.CHUNK_SIZE // 1024}K)")
+    parser.add_argument("--write-buffer", type = ratelimit.parse_rate, help = f"bytes coalesced into each disk write, e.g. 16M (default: {diskwriter.BUFFER_SIZE // 1024 ** 2}M)")
+    parser.add_argument("--fsync", choices = diskwriter.FSYNC_POLICIES, help = f"when downloads are synced to disk (default: {diskwriter.FSYNC})")
+    parser.add_argument("--fsync-interval", type = float, help = f"seconds between syncs with --fsync periodic (default: {diskwriter.FSYNC_INTERVAL:g})")
+    parser.add_argument("--no-preallocate", action = "store_true", help = "don't reserve disk space for downloads upfront")
+    parser.add_argument("--log-json", action = "store_true", help = f"write {utils.LOG_PATH} as JSON lines")
+    parser.add_argument("--metrics-dir", help = "write stage timings and counters to metrics.json and metrics.prom in this folder while running")
+    args = parser.parse_args(argv)
+    args.resolution = None if args.resolution == "Auto" else args.resolution
+    args.jobs       = max(1, min(args.jobs, downloader.MAX_WORKERS))
+    return parser, args
+
+
+def main(argv = None) -> int:
+    parser, args = parse_args(argv)
+    links = read_urls(args)
+    if not links:
+        parser.error("no links given.")
+
+    if args.log_json:
+        utils.LOGGER.set_json()
+    ratelimit.LIMITER.set_rate(args.limit_rate)
+    diskwriter.configure(args.chunk_size, args.write_buffer, args.fsync, args.fsync_interval, False if args.no_preallocate else None)
+    network.configure(pool_size = max(network.POOL_SIZE, args.jobs * args.segments))
+    reporter  = JsonReporter()
+    bus       = progress.ProgressBus(PROGRESS_INTERVAL)
+    cache_dir = None if args.no_cache else CACHE_PATH
+    cache     = metadata.MetadataCache(cache_dir = cache_dir)
+    cipher_cache.install(cache_dir)
+    videos    = []
+    playlists = []
+    results   = []
+    bus.subscribe(reporter.on_job)
+
+    for url in links:
+        link = urls.parse(url)
+        if link is None or link.kind == urls.CHANNEL:
+            reporter.emit("error", url = url, message = "not a YouTube video or playlist link.")
+            results.append(False)
+        elif link.kind == urls.PLAYLIST:
+            playlists.append(link.url)
+        else:
+            videos.append(link.url)
+
+    LOG.info(f"Headless mode: {len(videos)} videos and {len(playlists)} playlists queued.")
+    exporter = metrics.Exporter(metrics.REGISTRY, args.metrics_dir).start() if args.metrics_dir else None
+    try:
+        with ThreadPoolExecutor(max_workers = args.jobs, thread_name_prefix = "ytd_cli") as pool:
+            results += pool.map(lambda url: download_video(url, args, reporter, cache, bus), videos)
+
+        for url in playlists:
+            results.append(download_playlist(url, args, reporter, cache, bus))
+    finally:
+        if exporter:
+            exporter.stop()
+
+    reporter.emit("summary", succeeded = results.count(True), failed = results.count(False))
+    return 0 if all(results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,238 @@
+import os
+
+from queue     import Queue
+from src       import utils
+from threading import Event, Lock, Thread
+from time      import monotonic
+
+LOG            = utils.LOGGER()
+FSYNC_NONE     = "none"
+FSYNC_CLOSE    = "close"
+FSYNC_PERIODIC = "periodic"
+FSYNC_POLICIES = (FSYNC_NONE, FSYNC_CLOSE, FSYNC_PERIODIC)
+ALIGNMENT      = 4096 # writes end on a page/sector boundary when they can
+MAX_IOV        = 512  # chunks per vectored write
+
+# defaults, changed with `configure()`.
+CHUNK_SIZE     = 65536       # bytes read from the socket at a time
+BUFFER_SIZE    = 1024 * 1024 # bytes coalesced before a write
+MAX_PENDING    = 2           # full buffers waiting for the disk, per file
+FSYNC          = FSYNC_NONE
+FSYNC_INTERVAL = 5.0
+PREALLOCATE    = True
+
+
+def configure(
+    chunk_size: int = None,
+    buffer_size: int = None,
+    fsync: str = None,
+    fsync_interval: float = None,
+    preallocate: bool = None,
+):
+    """
+    Changes the defaults of writers created from now on. Arguments left to
+    `None` are kept as they are.
+    """
+    global CHUNK_SIZE, BUFFER_SIZE, FSYNC, FSYNC_INTERVAL, PREALLOCATE
+    if fsync is not None and fsync not in FSYNC_POLICIES:
+        raise ValueError(f"Unknown fsync policy {fsync!r}, expected one of {', '.join(FSYNC_POLICIES)}.")
+    CHUNK_SIZE     = max(1024, chunk_size) if chunk_size else CHUNK_SIZE
+    BUFFER_SIZE    = max(ALIGNMENT, buffer_size) if buffer_size else BUFFER_SIZE
+    FSYNC          = fsync or FSYNC
+    FSYNC_INTERVAL = fsync_interval or FSYNC_INTERVAL
+    PREALLOCATE    = PREALLOCATE if preallocate is None else preallocate
+    LOG.info(f"Disk writes: {CHUNK_SIZE // 1024} KB chunks, {BUFFER_SIZE // 1024} KB buffers, fsync {FSYNC}, preallocation {'on' if PREALLOCATE else 'off'}.")
+
+
+def preallocate(f, size: int):
+    """
+    Reserves `size` bytes for `f` so the file isn't fragmented as it's
+    filled in. Falls back to extending it when the filesystem can't reserve
+    space, e.g. some network shares.
+    """
+    if hasattr(os, "posix_fallocate"):
+        try:
+            os.posix_fallocate(f.fileno(), 0, size)
+            return
+        except OSError as e:
+            LOG.debug(f"posix_fallocate failed ({e}), extending the file instead.")
+    f.truncate(size)
+
+
+class DiskWriter:
+    """
+    Writes a download to `path` from a background thread, so the threads
+    reading from sockets never wait on the disk.
+
+    `write(offset, data)` can be called from several threads, each filling
+    in its own part of the file. Consecutive chunks form a run that is
+    written in `buffer_size` blocks ending on `ALIGNMENT` boundaries. Up to
+    `MAX_PENDING` blocks wait for the disk, after that writers block until
+    it catches up. A new file is preallocated to `filesize` when it's known.
+
+    `flush(offset)` returns once the run ending at `offset` is on the OS
+    side, e.g. before recording a segment's progress in a journal, without
+    waiting for the other runs. `close()` flushes everything, applies the
+    `fsync` policy and closes the file. Errors from the writer thread are
+    raised by the next call.
+    """
+    def __init__(
+        self,
+        path,
+        filesize: int = 0,
+        buffer_size: int = None,
+        fsync: str = None,
+        fsync_interval: float = None,
+        preallocate_file: bool = None,
+    ):
+        self.path           = path
+        self.buffer_size    = buffer_size or BUFFER_SIZE
+        self.fsync          = fsync or FSYNC
+        self.fsync_interval = fsync_interval or FSYNC_INTERVAL
+        self.written        = 0
+        # end offset -> (start offset, chunks, size, events of its queued blocks)
+        self._runs          = {}
+        self._lock          = Lock()
+        self._queue         = Queue(maxsize = MAX_PENDING)
+        self._error         = None
+        self._last_sync     = monotonic()
+        self._closed        = False
+
+        exists  = os.path.exists(path)
+        self._f = open(path, "r+b" if exists else "w+b", buffering = 0)
+        if filesize and (PREALLOCATE if preallocate_file is None else preallocate_file) and os.path.getsize(path) < filesize:
+            preallocate(self._f, filesize)
+        self._thread = Thread(target = self._run, name = "ytd_writer", daemon = True)
+        self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def write(self, offset: int, data: bytes):
+        self._check()
+        block = None
+        with self._lock:
+            start, chunks, size, pending = self._runs.pop(offset, (offset, [], 0, []))
+            chunks.append(data)
+            size += len(data)
+            end   = start + size
+            if size >= self.buffer_size:
+                chunks, tail = self._split(start, chunks, end)
+                block   = (start, chunks, Event())
+                pending = [event for event in pending if not event.is_set()] + [block[2]]
+                chunks  = tail
+                size    = sum(len(chunk) for chunk in tail)
+                start   = end - size
+            # kept even when empty, `flush(end)` waits on its blocks.
+            self._runs[end] = (start, chunks, size, pending)
+        if block:
+            self._queue.put(block)
+
+    @staticmethod
+    def _split(start: int, chunks: list, end: int) -> tuple[list, list]:
+        """
+        Splits a run at its last `ALIGNMENT` boundary into the chunks to
+        write now and the tail kept for the next write. A run that doesn't
+        cross a boundary is written whole.
+        """
+        cut  = end - end % ALIGNMENT
+        keep = end - cut if cut > start else 0
+        tail = []
+        while keep:
+            last = chunks.pop()
+            if len(last) <= keep:
+                tail.insert(0, last)
+                keep -= len(last)
+            else:
+                view  = memoryview(last)
+                split = len(view) - keep
+                chunks.append(view[:split])
+                tail.insert(0, view[split:])
+                keep  = 0
+        return chunks, tail
+
+    def flush(self, offset: int = None):
+        """
+        Waits until the run of writes ending at `offset` is handed to the
+        OS, or every run without `offset`.
+        """
+        self._check()
+        with self._lock:
+            if offset is None:
+                runs, self._runs = list(self._runs.values()), {}
+            else:
+                run  = self._runs.pop(offset, None)
+                runs = [run] if run else []
+            blocks  = []
+            pending = []
+            for start, chunks, size, events in runs:
+                pending += events
+                if size:
+                    blocks.append((start, chunks, Event()))
+                    pending.append(blocks[-1][2])
+        for block in blocks:
+            self._queue.put(block)
+        for event in pending:
+            event.wait()
+        self._check()
+
+    def sync(self):
+        """
+        Forces everything handed to the OS so far onto the disk, whatever
+        the `fsync` policy.
+        """
+        os.fsync(self._f.fileno())
+
+    def close(self, size: int = None):
+        """
+        Flushes and closes the file. `size` cuts it to its final length,
+        when less was written than was preallocated.
+        """
+        if self._closed:
+            return
+        try:
+            self.flush()
+            if size is not None and os.fstat(self._f.fileno()).st_size != size:
+                self._f.truncate(size)
+            if self.fsync != FSYNC_NONE:
+                os.fsync(self._f.fileno())
+        finally:
+            self._closed = True
+            self._queue.put(None)
+            self._thread.join()
+            self._f.close()
+
+    def _check(self):
+        if self._error:
+            raise IOError(f"Failed to write to {self.path}: {self._error}")
+
+    def _write(self, offset: int, chunks: list):
+        size = sum(len(chunk) for chunk in chunks)
+        done = 0
+        if hasattr(os, "pwritev") and len(chunks) <= MAX_IOV:
+            # the kernel gathers the chunks, nothing is copied.
+            done = os.pwritev(self._f.fileno(), chunks, offset)
+        if done < size:
+            view = memoryview(b"".join(chunks))[done:]
+            self._f.seek(offset + done)
+            while view:
+                view = view[self._f.write(view):]
+        self.written += size
+
+    def _run(self):
+        while (block := self._queue.get()) is not None:
+            offset, chunks, done = block
+            try:
+                if not self._error:
+                    self._write(offset, chunks)
+                    if self.fsync == FSYNC_PERIODIC and monotonic() - self._last_sync >= self.fsync_interval:
+                        os.fsync(self._f.fileno())
+                        self._last_sync = monotonic()
+            except Exception as e:
+                # kept for the next call, the thread has to keep draining the queue.
+                self._error = e
+            finally:
+                done.set()
@@ -0,0 +1,775 @@
+import json
+import os
+import requests
+
+from concurrent.futures import ThreadPoolExecutor
+from pathlib            import Path
+from pytubefix          import YouTube as YT, extract
+from pytubefix.helpers  import safe_filename
+from queue              import Queue
+from src                import archive, diskwriter, jobs, media, metadata, metrics, network, progress, ratelimit, resolver, utils
+from threading          import Lock
+from time               import monotonic, sleep
+
+LOG                = utils.LOGGER()
+MAX_WORKERS        = 8
+MAX_CONNECTIONS    = 8
+SEGMENTS           = 4
+MIN_SEGMENT_SIZE   = 4 * 1024 * 1024
+RETRIES            = 3
+JOURNAL_INTERVAL   = 1.0
+# pytubefix requests streams in ranges of this size too, YouTube
+# throttles connections that ask for much larger ranges.
+REQUEST_RANGE_SIZE = 9 * 1024 * 1024
+
+
+def resolve_video(url: str, metadata_cache: metadata.MetadataCache = None) -> YT:
+    """
+    Loads the video at `url` along with its stream manifest, so the stream
+    urls are deciphered by the time it returns.
+    """
+    with metrics.stage("resolve"):
+        yt = metadata_cache.video(url) if metadata_cache else YT(url)
+        _  = yt.streams
+    return yt
+
+
+def get_stream(video: YT, audio_only: bool = False, resolution: str = None):
+    """
+    Picks the stream to download from `video`. `resolution` is one of the
+    "144p"... "2160p" labels or `None` for the highest available one.
+    """
+    if audio_only:
+        return video.streams.get_audio_only()
+    if resolution:
+        return video.streams.filter(
+            res = resolution,
+            file_extension = 'mp4',
+            progressive = True
+        ).first()
+    return video.streams.get_highest_resolution()
+
+
+def get_streams(video: YT, audio_only: bool = False, resolution: str = None) -> list:
+    """
+    Picks the streams to download from `video`, see `get_stream()`. YouTube
+    only serves progressive streams up to 720p, higher resolutions come as
+    the best video-only stream plus the best audio-only stream, muxed once
+    both are downloaded. Without ffmpeg the highest progressive stream is
+    used instead. Returns an empty list if nothing matches.
+    """
+    stream = get_stream(video, audio_only, resolution)
+    if stream or audio_only or not resolution:
+        return [stream] if stream else []
+
+    if not media.has_ffmpeg():
+        LOG.warning(f"ffmpeg isn't installed, {resolution} isn't available. Downloading the highest progressive resolution instead.")
+        stream = video.streams.get_highest_resolution()
+        return [stream] if stream else []
+
+    videos       = video.streams.filter(res = resolution, adaptive = True, only_video = True)
+    video_stream = (
+        videos.filter(subtype = 'mp4').order_by('fps').desc().first() or
+        videos.order_by('fps').desc().first()
+    )
+    audio_stream = video.streams.get_audio_only()
+    if video_stream is None or audio_stream is None:
+        return []
+    return [video_stream, audio_stream]
+
+
+def stream_filepath(stream, folder) -> Path:
+    return Path(os.path.abspath(folder)) / Path(os.path.basename(stream.get_file_path(stream.default_filename)))
+
+
+def output_filepath(streams: list, folder) -> Path:
+    """
+    Where `streams` end up once downloaded. Muxed streams that aren't all
+    mp4 go into a Matroska container.
+    """
+    filepath = stream_filepath(streams[0], folder)
+    if len(streams) > 1 and filepath.suffix != ".mp4":
+        filepath = filepath.with_suffix(".mkv")
+    return filepath
+
+
+def download_streams(streams: list, filepath, on_chunk = None, segments: int = 1, rate_limit: ratelimit.TokenBucket = None):
+    """
+    Downloads `streams` to `filepath`. A video-only and an audio-only stream
+    are fetched at the same time and muxed into `filepath` with a stream
+    copy, so it takes about as long as the larger of the two downloads.
+    """
+    if len(streams) == 1:
+        return download_stream(streams[0], filepath, on_chunk, segments, rate_limit)
+
+    lock     = Lock()
+    filepath = Path(filepath)
+    parts    = [filepath.with_name(f"{filepath.stem}.f{stream.itag}{Path(stream.default_filename).suffix}") for stream in streams]
+
+    def report(size: int):
+        if on_chunk:
+            with lock:
+                on_chunk(size)
+
+    def fetch(index: int):
+        download_stream(streams[index], parts[index], report, segments, rate_limit)
+
+    LOG.info(f"Downloading video and audio streams in parallel ({', '.join(str(s.itag) for s in streams)})...")
+    with ThreadPoolExecutor(max_workers = len(streams), thread_name_prefix = "ytd_av") as pool:
+        for _ in pool.map(fetch, range(len(streams))):
+            pass
+
+    LOG.info("Muxing video and audio...")
+    with metrics.stage("postprocess"):
+        media.mux(parts[0], parts[1], filepath)
+    for part in parts:
+        os.remove(part)
+
+
+def download_stream(stream, filepath, on_chunk = None, segments: int = 1, rate_limit: ratelimit.TokenBucket = None):
+    """
+    Downloads `stream` to `filepath`, calling `on_chunk(size)` after every
+    chunk written to disk. When the server accepts byte ranges the download
+    is resumable and large files are fetched over up to `segments` connections.
+
+    Transfers are paced by the global `ratelimit.LIMITER` and by `rate_limit`
+    when given, neither throttles unless a rate is set.
+    """
+    filesize = stream.filesize
+    if filesize > 0 and supports_ranges(stream.url):
+        return download_segmented(stream.url, filepath, filesize, segments, on_chunk, stream.itag, rate_limit)
+
+    LOG.info("Server doesn't accept byte ranges, downloading over a single connection.")
+    part_path = part_filepath(filepath)
+    transfer  = metrics.TransferTimer()
+    writer    = diskwriter.DiskWriter(part_path, filesize)
+    received  = 0
+    try:
+        for chunk in stream.iter_chunks(diskwriter.CHUNK_SIZE):
+            writer.write(received, chunk)
+            received += len(chunk)
+            transfer.add(len(chunk))
+            if on_chunk:
+                on_chunk(len(chunk))
+            ratelimit.LIMITER.throttle(len(chunk), rate_limit)
+    finally:
+        writer.close(received)
+    transfer.done()
+    os.replace(part_path, filepath)
+
+
+def part_filepath(filepath) -> str:
+    return f"{filepath}.part"
+
+
+def supports_ranges(url: str) -> bool:
+    try:
+        with network.get(url, headers = {"Range": "bytes=0-0"}, stream = True) as response:
+            return response.status_code == 206
+    except requests.RequestException:
+        return False
+
+
+def split_ranges(filesize: int, segments: int) -> list[tuple[int, int]]:
+    """
+    Splits `filesize` bytes into at most `segments` inclusive (start, end)
+    ranges no smaller than `MIN_SEGMENT_SIZE`, except for the last one.
+    """
+    segments = max(1, min(segments, filesize // MIN_SEGMENT_SIZE))
+    step     = -(-filesize // segments)
+    return [(start, min(start + step, filesize) - 1) for start in range(0, filesize, step)]
+
+
+class DownloadJournal:
+    """
+    Sidecar `.part.json` file that records how many bytes of every segment
+    of a `.part` file are safely on disk, so an interrupted download can
+    continue from where it stopped instead of starting over. `sync()`, when
+    set, is called before every save to force those bytes onto the disk,
+    so the journal survives a power loss and not just a crash.
+    """
+    def __init__(self, path: str, url: str, itag: int, filesize: int, segments: list[list[int]]):
+        self.path       = path
+        self.url        = url
+        self.itag       = itag
+        self.filesize   = filesize
+        self.segments   = segments
+        self.sync       = None
+        self._lock      = Lock()
+        self._last_save = 0.0
+
+    @classmethod
+    def load(cls, path: str, itag: int, filesize: int):
+        """
+        Returns the journal at `path` if it belongs to the same stream,
+        otherwise `None`.
+        """
+        try:
+            with open(path, "r", encoding = "utf-8") as f:
+                data = json.load(f)
+            if data["itag"] != itag or data["filesize"] != filesize:
+                return None
+            return cls(path, data["url"], itag, filesize, data["segments"])
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    @property
+    def bytes_done(self) -> int:
+        return sum(done for _, _, done in self.segments)
+
+    def is_complete(self) -> bool:
+        return all(start + done > end for start, end, done in self.segments)
+
+    def commit(self, index: int, done: int):
+        """
+        Records `done` bytes for segment `index`. The caller must have flushed
+        those bytes to the `.part` file first. Saves to disk at most once every
+        `JOURNAL_INTERVAL` seconds.
+        """
+        with self._lock:
+            self.segments[index][2] = done
+            if monotonic() - self._last_save >= JOURNAL_INTERVAL:
+                self._save()
+
+    def save(self):
+        with self._lock:
+            self._save()
+
+    def remove(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def _save(self):
+        if self.sync:
+            self.sync()
+        data = {
+            "url": self.url,
+            "itag": self.itag,
+            "filesize": self.filesize,
+            "segments": self.segments,
+        }
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding = "utf-8") as f:
+            json.dump(data, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        self._last_save = monotonic()
+
+
+def download_segmented(
+    url: str,
+    filepath,
+    filesize: int,
+    segments: int = SEGMENTS,
+    on_chunk = None,
+    itag: int = None,
+    rate_limit: ratelimit.TokenBucket = None,
+):
+    """
+    Fetches `url` as parallel byte ranges into a `.part` file preallocated
+    to `filesize`, each range written at its own offset by a shared
+    `diskwriter.DiskWriter` off the network threads. Progress is kept in
+    a `DownloadJournal` so a later call for the same stream resumes from the
+    last committed offsets. The `.part` file is renamed to `filepath` once
+    every byte is accounted for. Raises `IOError` if the download comes up short.
+    """
+    lock         = Lock()
+    part_path    = part_filepath(filepath)
+    journal_path = f"{part_path}.json"
+
+    def report(size: int):
+        if on_chunk:
+            with lock:
+                on_chunk(size)
+
+    def fetch(index: int):
+        start, end, done = journal.segments[index]
+        attempt          = 0
+        last_commit      = monotonic()
+        while start + done <= end:
+            pos  = start + done
+            stop = min(pos + REQUEST_RANGE_SIZE, end + 1) - 1
+            try:
+                received = 0
+                headers  = {"Range": f"bytes={pos}-{stop}"}
+                with network.get(journal.url, headers = headers, stream = True) as response:
+                    if response.status_code != 206:
+                        raise IOError(f"Expected a partial response for bytes {pos}-{stop}, got HTTP {response.status_code}.")
+                    for chunk in response.iter_content(diskwriter.CHUNK_SIZE):
+                        chunk = chunk[:stop - pos + 1 - received]
+                        writer.write(pos + received, chunk)
+                        received += len(chunk)
+                        done     += len(chunk)
+                        transfer.add(len(chunk))
+                        report(len(chunk))
+                        ratelimit.LIMITER.throttle(len(chunk), rate_limit)
+                        if monotonic() - last_commit >= JOURNAL_INTERVAL:
+                            # only bytes handed to the OS are committed, other
+                            # segments' writes aren't waited for.
+                            writer.flush(start + done)
+                            journal.commit(index, done)
+                            last_commit = monotonic()
+                if received != stop - pos + 1:
+                    raise IOError(f"Range {pos}-{stop} is incomplete: got {received} of {stop - pos + 1} bytes.")
+                attempt = 0
+            except (requests.RequestException, IOError) as e:
+                attempt += 1
+                if attempt > RETRIES:
+                    raise
+                metrics.RETRIES.inc(reason = "segment")
+                LOG.warning(f"Segment {start}-{end} interrupted ({e}). Retrying from byte {start + done}...")
+                sleep(attempt)
+            finally:
+                writer.flush(start + done)
+                journal.commit(index, done)
+
+    journal = DownloadJournal.load(journal_path, itag, filesize) if os.path.exists(part_path) else None
+    if journal:
+        journal.url = url
+        LOG.info(f"Resuming download from {round(journal.bytes_done / 1024)} KB...")
+        report(journal.bytes_done)
+    else:
+        ranges  = split_ranges(filesize, segments)
+        journal = DownloadJournal(journal_path, url, itag, filesize, [[start, end, 0] for start, end in ranges])
+        if os.path.exists(part_path):
+            os.remove(part_path)
+
+    # a new .part file is preallocated to the full size.
+    writer       = diskwriter.DiskWriter(part_path, filesize)
+    journal.sync = writer.sync
+    journal.save()
+
+    pending  = [i for i, (start, end, done) in enumerate(journal.segments) if start + done <= end]
+    transfer = metrics.TransferTimer()
+    LOG.info(f"Downloading {round(filesize / 1024)} KB in {len(pending)} segments...")
+    try:
+        if pending:
+            with ThreadPoolExecutor(max_workers = len(pending), thread_name_prefix = "ytd_seg") as pool:
+                for _ in pool.map(fetch, pending):
+                    pass
+    finally:
+        try:
+            # the journal only vouches for bytes synced while the file is open.
+            writer.flush()
+            journal.save()
+        finally:
+            writer.close(filesize)
+    transfer.done()
+
+    if not journal.is_complete() or os.path.getsize(part_path) != filesize:
+        raise IOError(f"Downloaded file doesn't match the expected {filesize} bytes.")
+    os.replace(part_path, filepath)
+    journal.remove()
+
+
+def download_video(
+    url: str,
+    output_path,
+    audio_only: bool = False,
+    resolution: str = None,
+    mp3: bool = False,
+    segments: int = SEGMENTS,
+    metadata_cache: metadata.MetadataCache = None,
+    job: progress.JobState = None,
+    rate_limit: ratelimit.TokenBucket = None,
+    on_start = None,
+    on_chunk = None,
+) -> str:
+    """
+    Resolves and downloads a single video into `output_path` and returns the
+    path of the file written. Progress is published to `job` when given and
+    the transfer is capped by `rate_limit` on top of the global limit.
+    `on_start(stream, filepath, filesize)` is called once the streams are
+    picked, right before the transfer starts. `filesize` covers every stream
+    when video and audio are downloaded separately.
+    """
+    try:
+        yt = resolve_video(url, metadata_cache)
+        with metrics.stage("select"):
+            streams = get_streams(yt, audio_only, resolution)
+        if not streams:
+            raise ValueError("No stream matches the selected options.")
+
+        def report(size: int):
+            if job:
+                job.item_progress(0, size)
+            if on_chunk:
+                on_chunk(size)
+
+        os.makedirs(output_path, exist_ok = True)
+        filepath = output_filepath(streams, output_path)
+        filesize = sum(stream.filesize for stream in streams)
+        if job:
+            job.item_started(0, streams[0].title, filesize)
+        if on_start:
+            on_start(streams[0], filepath, filesize)
+        def on_converting(fraction: float):
+            if job:
+                job.item_converting(0, fraction)
+
+        download_streams(streams, filepath, report, segments, rate_limit)
+        if mp3:
+            filepath = to_mp3(filepath, stream_duration(streams), on_converting)
+        if job:
+            job.item_finished(0)
+    except jobs.Cancelled:
+        metrics.ITEMS.inc(state = "cancelled")
+        raise
+    except Exception:
+        metrics.ITEMS.inc(state = "failed")
+        raise
+    metrics.ITEMS.inc(state = "done")
+    return str(filepath)
+
+
+def playlist_length(playlist) -> int:
+    """
+    Number of videos shown in the playlist's header, without paging through
+    it. `None` if it can't be read.
+    """
+    try:
+        return playlist.length
+    except Exception:
+        return None
+
+
+def playlist_folder(playlist, output_path) -> Path:
+    return Path(output_path) / safe_filename(playlist.title or playlist.playlist_id)
+
+
+def stream_duration(streams: list) -> float:
+    try:
+        return int(streams[0].durationMs) / 1000
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+def to_mp3(filepath, duration: float = None, on_progress = None) -> str:
+    """
+    Transcodes a downloaded audio file to mp3 with ffmpeg. Without ffmpeg the
+    original file is kept, renaming it wouldn't make it an mp3.
+    """
+    if not media.has_ffmpeg():
+        LOG.warning(f"ffmpeg isn't installed, keeping {os.path.basename(filepath)} as is.")
+        return str(filepath)
+    with metrics.stage("postprocess"):
+        return media.to_mp3(filepath, duration, on_progress)
+
+
+class DownloadItem:
+    def __init__(self, index: int, url: str):
+        self.index     = index
+        self.url       = url
+        self.video_id  = None
+        self.title     = url
+        self.path      = None
+        self.filesize  = 0
+        self.duration  = None
+        self.progress  = 0
+        self.status    = "Queued"
+
+    def add_progress(self, size: int):
+        self.progress += size
+
+
+class PlaylistDownloader:
+    """
+    Downloads a playlist as a three stage pipeline: the video urls are read
+    lazily from `video_urls`, `workers` threads resolve their streams and up
+    to `max_connections` threads download them. Stages are linked by bounded
+    queues, so memory stays flat however long the playlist is and the first
+    transfer starts as soon as the first stream is resolved. Only the items
+    currently being resolved or downloaded are kept around.
+
+    `total` is the number of videos when known upfront, it's only used for
+    progress reporting. Videos already recorded in `download_archive` for the
+    same format are skipped before their streams are resolved. Videos are
+    resolved through `metadata_cache` when given, and per-item progress is
+    published to `job`. `rate_limit` caps the whole playlist, shared by all
+    of its transfers. With a `stream_resolver` streams are resolved in its
+    worker processes instead of on the resolver threads.
+
+    mp3 conversions run on their own pool, one ffmpeg process per core, while
+    the next videos keep downloading.
+    """
+    def __init__(
+        self,
+        video_urls,
+        output_path,
+        audio_only: bool = False,
+        resolution: str = None,
+        mp3: bool = False,
+        workers: int = 4,
+        max_connections: int = MAX_CONNECTIONS,
+        download_archive: archive.DownloadArchive = None,
+        metadata_cache: metadata.MetadataCache = None,
+        job: progress.JobState = None,
+        rate_limit: ratelimit.TokenBucket = None,
+        total: int = None,
+        stream_resolver: resolver.ProcessResolver = None,
+    ):
+        self.video_urls  = video_urls
+        self.output_path = output_path
+        self.audio_only  = audio_only
+        self.resolution  = resolution
+        self.mp3         = mp3
+        self.workers     = max(1, min(workers, MAX_WORKERS))
+        self.connections = max(1, min(max_connections, self.workers))
+        self.archive     = download_archive
+        self.cache       = metadata_cache
+        self.job         = job
+        self.rate_limit  = rate_limit
+        self.resolver    = stream_resolver
+        self.total       = len(video_urls) if isinstance(video_urls, (list, tuple)) else total
+        self.format      = archive.format_key(audio_only, resolution, mp3)
+        self.cancelled   = False
+        self.queued      = 0
+        self.completed   = 0
+        self.skipped     = 0
+        self.failed      = 0
+        self.stopped     = 0  # items cancelled before they finished
+        self._lock       = Lock()
+
+    @property
+    def finished(self) -> int:
+        return self.completed + self.skipped + self.failed + self.stopped
+
+    def cancel(self):
+        self.cancelled = True
+
+    def run(self, on_item_done = None, on_item_progress = None):
+        """
+        Blocks until every item is either downloaded or failed. `on_item_done(item)`
+        and `on_item_progress(item, size)` are called from the worker threads
+        as items finish and as chunks are written. Raises if the playlist
+        itself couldn't be read, after the items already queued are done.
+        """
+        to_resolve  = Queue(maxsize = self.workers * 2)
+        to_download = Queue(maxsize = self.connections)
+        errors      = []
+        resolving   = self.workers
+
+        def finish(item: DownloadItem):
+            metrics.ITEMS.inc(state = item.status.lower())
+            with self._lock:
+                if item.status == "Done":
+                    self.completed += 1
+                elif item.status == "Skipped":
+                    self.skipped += 1
+                elif item.status == "Cancelled":
+                    self.stopped += 1
+                else:
+                    self.failed += 1
+            if on_item_done:
+                try:
+                    on_item_done(item)
+                except Exception as e:
+                    LOG.error(f"{self._label(item)} Item callback failed: {e}")
+
+        def produce():
+            try:
+                for index, url in enumerate(self.video_urls):
+                    if self.cancelled:
+                        break
+                    item = DownloadItem(index, url)
+                    with self._lock:
+                        self.queued += 1
+                    if self.job and not self.total:
+                        self.job.set_items_total(self.queued)
+                    metrics.QUEUE_DEPTH.inc(queue = "resolve")
+                    to_resolve.put(item)
+            except Exception as e:
+                LOG.error(f"Failed to read the playlist: {e}")
+                errors.append(e)
+            finally:
+                if self.total != self.queued and not self.cancelled and not errors:
+                    self.total = self.queued
+                    if self.job:
+                        self.job.set_items_total(self.total)
+                for _ in range(self.workers):
+                    to_resolve.put(None)
+
+        def fail(item: DownloadItem, e: Exception):
+            # keeps the stage draining its queue, a dead worker would leave
+            # the others waiting for it forever.
+            LOG.error(f"{self._label(item)} Unexpected error, skipping this video: {e}")
+            if item.status not in ("Done", "Skipped", "Failed", "Cancelled"):
+                item.status = "Failed"
+                if self.job:
+                    self.job.item_finished(item.index, progress.FAILED, item.title)
+                finish(item)
+
+        def resolve():
+            nonlocal resolving
+            try:
+                while (item := to_resolve.get()) is not None:
+                    metrics.QUEUE_DEPTH.dec(queue = "resolve")
+                    try:
+                        streams = self._resolve_item(item)
+                        if streams:
+                            metrics.QUEUE_DEPTH.inc(queue = "download")
+                            to_download.put((item, streams))
+                        else:
+                            finish(item)
+                    except Exception as e:
+                        fail(item, e)
+            finally:
+                with self._lock:
+                    resolving -= 1
+                    last = resolving == 0
+                if last:
+                    for _ in range(self.connections):
+                        to_download.put(None)
+
+        def convert(item: DownloadItem):
+            self._convert_item(item)
+            finish(item)
+
+        def download():
+            while (entry := to_download.get()) is not None:
+                metrics.QUEUE_DEPTH.dec(queue = "download")
+                item, streams = entry
+                try:
+                    self._download_item(item, streams, on_item_progress)
+                    if item.status == "Converting":
+                        converter.submit(convert, item)
+                    else:
+                        finish(item)
+                except Exception as e:
+                    fail(item, e)
+
+        if self.job and self.total:
+            self.job.set_items_total(self.total)
+        with ThreadPoolExecutor(max_workers = media.TRANSCODE_WORKERS, thread_name_prefix = "ytd_ffmpeg") as converter:
+            with ThreadPoolExecutor(max_workers = self.workers + self.connections + 1, thread_name_prefix = "ytd_dl") as pool:
+                futures  = [pool.submit(produce)]
+                futures += [pool.submit(resolve) for _ in range(self.workers)]
+                futures += [pool.submit(download) for _ in range(self.connections)]
+                for future in futures:
+                    future.result()
+        if errors:
+            raise errors[0]
+
+    def _label(self, item: DownloadItem) -> str:
+        return f"({item.index + 1}/{self.total or '?'})"
+
+    def _resolve_item(self, item: DownloadItem):
+        """
+        Returns the streams to download for `item`, or `None` once the item
+        is finished (skipped, failed or cancelled).
+        """
+        label = self._label(item)
+        if self.cancelled:
+            item.status = "Cancelled"
+            if self.job:
+                self.job.item_finished(item.index, progress.CANCELLED, item.title)
+            return None
+        try:
+            video_id = extract.video_id(item.url)
+            if self.archive is not None and self.archive.contains(video_id, self.format):
+                item.path, item.filesize = self.archive.get(video_id, self.format)
+                item.status = "Skipped"
+                LOG.info(f"{label} Already downloaded to {item.path}, skipping.")
+                if self.job:
+                    self.job.item_finished(item.index, progress.SKIPPED, item.path)
+                return None
+
+            item.status = "Resolving"
+            LOG.info(f"{label} Getting {'audio' if self.audio_only else 'video'} stream...")
+            if self.resolver:
+                streams = self.resolver.resolve(item.url, self.audio_only, self.resolution)
+            else:
+                vid = resolve_video(item.url, self.cache)
+                with metrics.stage("select"):
+                    streams = get_streams(vid, self.audio_only, self.resolution)
+            if not streams:
+                raise ValueError("No stream matches the selected options.")
+
+            item.video_id = video_id
+            item.title    = streams[0].title
+            item.filesize = sum(stream.filesize for stream in streams)
+            item.duration = stream_duration(streams)
+            item.path     = output_filepath(streams, self.output_path)
+            item.status   = "Resolved"
+            return streams
+        except Exception as e:
+            item.status = "Failed"
+            LOG.warning(f"{label}: Couldn't resolve the video! Skipping it. Traceback: {e}")
+            if self.job:
+                self.job.item_finished(item.index, progress.FAILED, item.title)
+            return None
+
+    def _download_item(self, item: DownloadItem, streams: list, on_progress = None):
+        label = self._label(item)
+        if self.cancelled:
+            item.status = "Cancelled"
+            if self.job:
+                self.job.item_finished(item.index, progress.CANCELLED, item.title)
+            return
+        try:
+            def on_chunk(size: int):
+                # stops in-flight transfers too, the .part file and its
+                # journal are kept so the download resumes next time.
+                if self.cancelled:
+                    raise jobs.Cancelled("Cancelled by the user.")
+                item.add_progress(size)
+                if self.job:
+                    self.job.item_progress(item.index, size)
+                if on_progress:
+                    try:
+                        on_progress(item, size)
+                    except Exception as e:
+                        LOG.error(f"{label} Progress callback failed: {e}")
+
+            if self.job:
+                self.job.item_started(item.index, item.title, item.filesize)
+
+            item.status = "Downloading"
+            LOG.info(f"{label} Downloading...")
+            download_streams(streams, item.path, on_chunk, rate_limit = self.rate_limit)
+
+            if self.mp3:
+                item.status = "Converting"
+                return
+            self._complete_item(item)
+        except jobs.Cancelled:
+            item.status = "Cancelled"
+            LOG.info(f"{label} Download cancelled.")
+            if self.job:
+                self.job.item_finished(item.index, progress.CANCELLED, item.title)
+        except Exception as e:
+            item.status = "Failed"
+            LOG.warning(f"{label}: Download failed! Skipping this video. Traceback: {e}")
+            if self.job:
+                self.job.item_finished(item.index, progress.FAILED, item.title)
+
+    def _convert_item(self, item: DownloadItem):
+        label = self._label(item)
+
+        def on_converting(fraction: float):
+            if self.job:
+                self.job.item_converting(item.index, fraction)
+
+        try:
+            LOG.info(f"{label} Converting to mp3...")
+            on_converting(0.0)
+            item.path = to_mp3(item.path, item.duration, on_converting)
+            self._complete_item(item)
+        except Exception as e:
+            item.status = "Failed"
+            LOG.warning(f"{label}: Conversion failed! Skipping this video. Traceback: {e}")
+            if self.job:
+                self.job.item_finished(item.index, progress.FAILED, item.title)
+
+    def _complete_item(self, item: DownloadItem):
+        if self.archive is not None:
+            # without ffmpeg the audio is kept as is, it's archived as what it
+            # is so an mp3 run converts it once ffmpeg is available.
+            fmt = self.format
+            if self.mp3 and Path(item.path).suffix.lower() != ".mp3":
+                fmt = archive.format_key(self.audio_only, self.resolution)
+            self.archive.add(item.video_id, fmt, item.path, os.path.getsize(item.path))
+        item.status = "Done"
+        if self.job:
+            self.job.item_finished(item.index)
@@ -1,41 +1,184 @@
 import glfw
-import numpy as np
+import imgui
 import OpenGL.GL as gl
 
-from cv2        import cvtColor, imread, COLOR_BGR2RGBA, IMREAD_UNCHANGED
-from pathlib    import Path
-from PIL        import Image
-from src        import utils
+from collections import OrderedDict
+from pathlib     import Path
+from src         import media, utils
+from time        import perf_counter
 
 PARENT_PATH = Path(__file__).parent
 ASSETS_PATH = PARENT_PATH / Path(r"assets")
 LOG         = utils.LOGGER()
 
+# image libraries are slow to import and not needed to open the window,
+# they're loaded the first time an icon is set.
+np    = utils.LazyModule("numpy")
+Image = utils.LazyModule("PIL.Image")
+
 
 def relative_path(path: str):
     return ASSETS_PATH / Path(path)
 
 
-def draw_image(path):
+def upload_texture(img_data):
+    h, w    = img_data.shape[:2]
+    texture = gl.glGenTextures(1)
+    gl.glBindTexture(gl.GL_TEXTURE_2D, texture)
+    gl.glTexParameteri(gl.GL_TEXTURE_2D, gl.GL_TEXTURE_MAG_FILTER, gl.GL_LINEAR)
+    gl.glTexParameteri(gl.GL_TEXTURE_2D, gl.GL_TEXTURE_MIN_FILTER, gl.GL_LINEAR)
+    gl.glPixelStorei(gl.GL_UNPACK_ALIGNMENT, 1)
+    gl.glTexImage2D(gl.GL_TEXTURE_2D, 0, gl.GL_RGBA, w, h, 0, gl.GL_RGBA, gl.GL_UNSIGNED_BYTE, img_data)
+    gl.glBindTexture(gl.GL_TEXTURE_2D, 0)
+    return texture, w, h
+
+
+def draw_image(source):
+    """
+    Uploads `source` to the GPU. `source` can either be a path to an image
+    file or an already decoded RGBA array.
+    """
     try:
-        img  = imread(path, IMREAD_UNCHANGED)
-        img  = cvtColor(img, COLOR_BGR2RGBA)
-        h, w = img.shape[:2]
-
-        img_data = np.ascontiguousarray(img, dtype=np.uint8)
-        texture  = gl.glGenTextures(1)
-        gl.glBindTexture(gl.GL_TEXTURE_2D, texture)
-        gl.glTexParameteri(gl.GL_TEXTURE_2D, gl.GL_TEXTURE_MAG_FILTER, gl.GL_LINEAR)
-        gl.glTexParameteri(gl.GL_TEXTURE_2D, gl.GL_TEXTURE_MIN_FILTER, gl.GL_LINEAR)
-        gl.glPixelStorei(gl.GL_UNPACK_ALIGNMENT, 1)
-        gl.glTexImage2D(gl.GL_TEXTURE_2D, 0, gl.GL_RGBA, w, h, 0, gl.GL_RGBA, gl.GL_UNSIGNED_BYTE, img_data)
-        gl.glBindTexture(gl.GL_TEXTURE_2D, 0)
-        return texture, w, h
+        img_data = media.decode_image(source) if isinstance(source, (str, Path)) else source
+        return upload_texture(img_data)
     except Exception as e:
         LOG.error(f"Unhandled exception in function draw_image(): {e}")
         return None, 0, 0
 
 
+class TextureCache:
+    """
+    Keeps decoded images resident on the GPU so they are uploaded once
+    and reused on every frame. Least recently used textures are released
+    once the total size goes over `max_bytes`.
+
+    Must only be used from the thread that owns the GL context.
+    """
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+        self.max_bytes  = max_bytes
+        self.used_bytes = 0
+        self._textures  = OrderedDict()
+
+    def get(self, key, source) -> tuple[int, int, int]:
+        """
+        Returns `(texture, width, height)` for `key`, decoding and uploading
+        `source` only the first time the key is seen.
+        """
+        if key in self._textures:
+            self._textures.move_to_end(key)
+            return self._textures[key][:3]
+
+        texture, w, h = draw_image(source)
+        size = w * h * 4
+        # failed loads are cached too so we don't retry them every frame.
+        self._textures[key] = (texture, w, h, size)
+        self.used_bytes += size
+        self._evict()
+        return texture, w, h
+
+    def release(self, key):
+        entry = self._textures.pop(key, None)
+        if entry:
+            self._delete(entry)
+
+    def clear(self):
+        while self._textures:
+            _, entry = self._textures.popitem()
+            self._delete(entry)
+
+    def _evict(self):
+        while self.used_bytes > self.max_bytes and len(self._textures) > 1:
+            _, entry = self._textures.popitem(last = False)
+            self._delete(entry)
+
+    def _delete(self, entry):
+        texture, _, _, size = entry
+        self.used_bytes -= size
+        if texture is not None:
+            gl.glDeleteTextures([texture])
+
+
+class FrameScheduler:
+    """
+    Replaces the busy `poll_events()` loop. While `active` is set (downloads
+    running, info loading...) frames are drawn at `fps`, or `background_fps`
+    when the window isn't focused. Otherwise the loop blocks in
+    `wait_events_timeout()` until there's input, a `wake()` call from a
+    worker thread, or the idle timeout runs out. Either way frames are never
+    drawn faster than the cap, however many events come in.
+    """
+    def __init__(
+        self,
+        fps: int = 60,
+        background_fps: int = 10,
+        idle_timeout: float = 0.5,
+        background_timeout: float = 2.0,
+    ):
+        self.fps                = fps
+        self.background_fps     = background_fps
+        self.idle_timeout       = idle_timeout
+        self.background_timeout = background_timeout
+        self.active             = False
+        self.frame_ms           = 0.0
+        self.frame_rate         = 0.0
+        self._frame_start       = perf_counter()
+        self._last_frame        = self._frame_start
+
+    @staticmethod
+    def wake():
+        """
+        Makes the render loop draw a new frame now. Can be called from any thread.
+        """
+        glfw.post_empty_event()
+
+    def wait(self, window):
+        """
+        Blocks until the next frame should be drawn and processes pending events.
+        """
+        focused   = glfw.get_window_attrib(window, glfw.FOCUSED)
+        iconified = glfw.get_window_attrib(window, glfw.ICONIFIED)
+        fps       = self.fps if focused else self.background_fps
+        deadline  = self._frame_start + 1.0 / max(fps, 1)
+        if self.active and not iconified:
+            self._wait_until(deadline)
+            glfw.poll_events()
+        else:
+            glfw.wait_events_timeout(self.idle_timeout if focused and not iconified else self.background_timeout)
+            # input wakes the loop right away, but still no faster than the cap.
+            self._wait_until(deadline)
+        self._frame_start = perf_counter()
+
+    @staticmethod
+    def _wait_until(deadline: float):
+        # any event (mouse motion, `wake()`...) ends `wait_events_timeout()`
+        # early, so keep waiting until the deadline.
+        while (remaining := deadline - perf_counter()) > 0:
+            glfw.wait_events_timeout(remaining)
+
+    def frame_done(self):
+        """
+        Call after `swap_buffers()` to update the frame time counters.
+        """
+        now      = perf_counter()
+        interval = now - self._last_frame
+        self._last_frame = now
+        self.frame_ms    = self.frame_ms * 0.9 + (now - self._frame_start) * 1000 * 0.1
+        if interval > 0:
+            self.frame_rate = self.frame_rate * 0.9 + (1.0 / interval) * 0.1
+
+
+def apply_style(colors: dict, style_vars: dict):
+    """
+    Sets style colors and variables once on the global style instead of
+    pushing and popping them on every frame.
+    """
+    style = imgui.get_style()
+    for color, value in colors.items():
+        style.colors[color] = (*value, 1.0) if len(value) == 3 else value
+    for name, value in style_vars.items():
+        setattr(style, name, value)
+
+
 def fb_to_window_factor(window):
     """
     Frame buffer to window factor.
@@ -65,16 +208,7 @@ def new_window(title: str, width: int, height: int, resizable: bool) -> tuple[ob
     window       = glfw.create_window(int(width), int(height), title, None, None)
     ibeam_cursor = glfw.create_standard_cursor(glfw.IBEAM_CURSOR)
     hand_cursor  = glfw.create_standard_cursor(glfw.POINTING_HAND_CURSOR)
-    icon         = Image.open(relative_path("img/ytd_icon.ico"))
-    icon         = icon.convert("RGBA")
-    icon_data    = np.array(icon, dtype=np.uint8)
-    icon_struct  = [
-        icon.width,
-        icon.height,
-        icon_data
-    ]
     glfw.set_window_pos(window, int(pos_x / 2 - width / 2), int(pos_y / 2 - height / 2))
-    glfw.set_window_icon(window, 1, icon_struct)
     glfw.make_context_current(window)
 
     if not window:
@@ -84,6 +218,22 @@ def new_window(title: str, width: int, height: int, resizable: bool) -> tuple[ob
     return window, ibeam_cursor, hand_cursor
 
 
+def set_window_icon(window, path = "img/ytd_icon.ico"):
+    """
+    Kept out of `new_window()` so PIL and numpy don't have to be imported
+    before the first frame is shown.
+    """
+    icon        = Image.open(relative_path(path))
+    icon        = icon.convert("RGBA")
+    icon_data   = np.array(icon, dtype=np.uint8)
+    icon_struct = [
+        icon.width,
+        icon.height,
+        icon_data
+    ]
+    glfw.set_window_icon(window, 1, icon_struct)
+
+
 def set_cursor(window, cursor):
     glfw.set_cursor(window, cursor)
 
@@ -98,10 +248,14 @@ class Icons:
     Close     = "\uf00d"
     Gear      = "\uf013"
     Download  = "\uf019"
+    ArrowUp   = "\uf062"
+    ArrowDown = "\uf063"
     Views     = "\uf06e"
     Calendar  = "\uf073"
     Folder    = "\uf07c"
+    Stats     = "\uf080"
     GitHub    = "\uf09b"
+    Queue     = "\uf0ca"
     Spinner   = "\uf110"
     YouTube   = "\uf167"
 
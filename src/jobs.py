@@ -0,0 +1,286 @@
+import json
+import os
+
+from heapq     import heappop, heappush
+from itertools import count
+from src       import metrics, progress, ratelimit, utils
+from threading import Condition, Thread
+from time      import time
+
+LOG    = utils.LOGGER()
+LOW    = 0
+NORMAL = 1
+HIGH   = 2
+PRIORITY_NAMES = {LOW: "Low", NORMAL: "Normal", HIGH: "High"}
+
+
+class Cancelled(Exception):
+    pass
+
+
+class Job:
+    """
+    One queued link. `options` holds whatever the runner needs to download
+    it (format, resolution...) and must be JSON serializable so the job can
+    be persisted. Progress is reported through `progress`. `rate_limit` caps
+    the job's transfers on top of the global limit, its rate is kept in
+    `options["rate_limit"]` so it survives a restart.
+    """
+    def __init__(self, url: str, kind: str, options: dict = None, priority: int = NORMAL, title: str = None, added_at: float = None):
+        self.url        = url
+        self.kind       = kind
+        self.options    = options or {}
+        self.priority   = priority
+        self.title      = title or url
+        self.added_at   = added_at or time()
+        self.progress   = None
+        self.cancelled  = False
+        self.on_cancel  = None
+        self.rate_limit = ratelimit.LIMITER.job_bucket(self.options.get("rate_limit", 0))
+
+    @property
+    def job_id(self) -> int:
+        return self.progress.job_id
+
+    @property
+    def state(self) -> str:
+        return self.progress.state
+
+    def check_cancelled(self):
+        if self.cancelled:
+            raise Cancelled("Cancelled by the user.")
+
+    def to_dict(self) -> dict:
+        return {
+            "url": self.url,
+            "kind": self.kind,
+            "options": self.options,
+            "priority": self.priority,
+            "title": self.title,
+            "added_at": self.added_at,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Job":
+        return cls(
+            data["url"],
+            data["kind"],
+            data.get("options"),
+            data.get("priority", NORMAL),
+            data.get("title"),
+            data.get("added_at"),
+        )
+
+
+class JobQueue:
+    """
+    Runs queued jobs on up to `max_running` threads, highest priority first
+    and in the order they were added within a priority. `runner(job)` does
+    the actual download and raises on failure.
+
+    Pending jobs are saved to `path` whenever the queue changes and loaded
+    back on the next start. Jobs that were running when the app closed are
+    queued again, their downloads resume from the partial files.
+    """
+    def __init__(self, runner, bus: progress.ProgressBus, path = None, max_running: int = 2):
+        self.runner      = runner
+        self.bus         = bus
+        self.path        = path
+        self.max_running = max(1, max_running)
+        self.running     = 0
+        self._jobs       = {}
+        self._heap       = []
+        self._seq        = count()
+        self._cond       = Condition()
+        self._thread     = None
+        self._stopped    = False
+        if path:
+            self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding = "utf-8") as f:
+                saved = json.load(f)["jobs"]
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError, KeyError) as e:
+            LOG.warning(f"Failed to read the download queue from {self.path}: {e}")
+            return
+
+        for data in saved:
+            try:
+                self._enqueue(Job.from_dict(data))
+            except (KeyError, TypeError) as e:
+                LOG.warning(f"Skipping invalid queue entry {data}: {e}")
+        if saved:
+            LOG.info(f"Restored {len(saved)} queued downloads.")
+
+    def _update_depth(self):
+        metrics.QUEUE_DEPTH.set(sum(1 for job in self._jobs.values() if job.state == progress.QUEUED), queue = "jobs")
+
+    def _save(self):
+        self._update_depth()
+        if not self.path:
+            return
+        jobs     = [job.to_dict() for job in self._jobs.values() if job.state in (progress.QUEUED, progress.RUNNING)]
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, "w", encoding = "utf-8") as f:
+                json.dump({"jobs": jobs}, f, indent = 2)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            LOG.warning(f"Failed to save the download queue: {e}")
+
+    def _enqueue(self, job: Job) -> Job:
+        job.progress = self.bus.create_job(job.title, job.kind)
+        with self._cond:
+            self._jobs[job.job_id] = job
+            heappush(self._heap, (-job.priority, next(self._seq), job.job_id))
+            self._update_depth()
+            self._cond.notify()
+        return job
+
+    def add(self, url: str, kind: str, options: dict = None, priority: int = NORMAL, title: str = None) -> Job:
+        job = self._enqueue(Job(url, kind, options, priority, title))
+        LOG.info(f"Queued {kind} {job.title} ({PRIORITY_NAMES.get(priority, priority)} priority).")
+        with self._cond:
+            self._save()
+        return job
+
+    def get(self, job_id: int) -> Job:
+        with self._cond:
+            return self._jobs.get(job_id)
+
+    def jobs(self) -> list[Job]:
+        """
+        Running jobs first, then queued ones in the order they'll start,
+        then finished ones.
+        """
+        order = {progress.RUNNING: 0, progress.QUEUED: 1}
+        with self._cond:
+            jobs = list(self._jobs.values())
+        return sorted(jobs, key = lambda job: (order.get(job.state, 2), -job.priority, job.job_id))
+
+    def pending(self) -> int:
+        with self._cond:
+            return sum(1 for job in self._jobs.values() if job.state == progress.QUEUED)
+
+    def set_priority(self, job_id: int, priority: int):
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if not job or job.state != progress.QUEUED or job.priority == priority:
+                return
+            # the old heap entry goes stale and is skipped when popped.
+            job.priority = priority
+            heappush(self._heap, (-priority, next(self._seq), job_id))
+            self._save()
+            self._cond.notify()
+
+    def set_rate_limit(self, job_id: int, rate: int):
+        """
+        Caps a queued or running job at `rate` bytes per second, 0 for no
+        limit. Takes effect right away for running transfers.
+        """
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if not job or job.state not in (progress.QUEUED, progress.RUNNING):
+                return
+            job.options["rate_limit"] = max(0, int(rate))
+            job.rate_limit.set_rate(job.options["rate_limit"])
+            self._save()
+
+    def set_max_running(self, max_running: int):
+        with self._cond:
+            self.max_running = max(1, max_running)
+            self._cond.notify_all()
+
+    def cancel(self, job_id: int):
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if not job or job.state not in (progress.QUEUED, progress.RUNNING):
+                return
+            job.cancelled = True
+            if job.state == progress.QUEUED:
+                job.progress.set_status("Cancelled.", progress.CANCELLED)
+            self._save()
+        if job.on_cancel:
+            job.on_cancel()
+
+    def remove(self, job_id: int):
+        """
+        Forgets a job that isn't running, cancelling it if it's still queued.
+        """
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if not job or job.state == progress.RUNNING:
+                return
+            del self._jobs[job_id]
+            self._save()
+        self.bus.remove_job(job_id)
+
+    def clear_finished(self):
+        with self._cond:
+            finished = [job_id for job_id, job in self._jobs.items() if job.state not in (progress.QUEUED, progress.RUNNING)]
+            for job_id in finished:
+                del self._jobs[job_id]
+        for job_id in finished:
+            self.bus.remove_job(job_id)
+
+    def start(self):
+        if self._thread:
+            return
+        self._stopped = False
+        self._thread  = Thread(target = self._schedule, name = "ytd_queue", daemon = True)
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stops starting new jobs. Running jobs keep going until the process
+        exits and stay in the saved queue, so they're resumed next time.
+        """
+        with self._cond:
+            self._stopped = True
+            self._save()
+            self._cond.notify_all()
+
+    def _next_job(self) -> Job:
+        while self._heap:
+            priority, _, job_id = heappop(self._heap)
+            job = self._jobs.get(job_id)
+            if job and job.state == progress.QUEUED and -priority == job.priority:
+                return job
+        return None
+
+    def _schedule(self):
+        while True:
+            with self._cond:
+                while not self._stopped and (self.running >= self.max_running or not self._heap):
+                    self._cond.wait()
+                if self._stopped:
+                    return
+                job = self._next_job()
+                if not job:
+                    continue
+                self.running += 1
+                job.progress.set_status("Starting...", progress.RUNNING)
+                self._update_depth()
+            Thread(target = self._run, args = (job,), name = f"ytd_job_{job.job_id}", daemon = True).start()
+
+    def _run(self, job: Job):
+        try:
+            LOG.info(f"Starting {job.kind} {job.title}...")
+            self.runner(job)
+            if job.state == progress.RUNNING:
+                job.progress.set_status("Done.", progress.DONE)
+        except Cancelled:
+            job.progress.set_status("Cancelled.", progress.CANCELLED)
+            LOG.info(f"Cancelled {job.title}.")
+        except Exception as e:
+            if job.state == progress.RUNNING:
+                job.progress.set_status(f"Failed: {e}", progress.FAILED)
+            LOG.error(f"Failed to download {job.title}: {e}")
+        finally:
+            with self._cond:
+                self.running -= 1
+                self._save()
+                self._cond.notify()
@@ -0,0 +1,129 @@
+import os
+import shutil
+import subprocess
+
+from functools import cache
+from pathlib   import Path
+from src       import utils
+
+LOG               = utils.LOGGER()
+MP3_QUALITY       = "2" # LAME VBR preset, around 190 kbps
+TRANSCODE_WORKERS = os.cpu_count() or 1
+# keeps ffmpeg from flashing a console window when started from the GUI.
+CREATE_NO_WINDOW  = getattr(subprocess, "CREATE_NO_WINDOW", 0)
+
+# image decoding libraries are slow to import and not needed to open the
+# window, they're loaded the first time an image is decoded.
+cv2 = utils.LazyModule("cv2")
+np  = utils.LazyModule("numpy")
+
+
+@cache
+def ffmpeg_path() -> str:
+    """
+    ffmpeg next to the executable or on the PATH, `None` if it's missing.
+    """
+    local = shutil.which("ffmpeg", path = utils.executable_path())
+    return local or shutil.which("ffmpeg")
+
+
+def has_ffmpeg() -> bool:
+    return ffmpeg_path() is not None
+
+
+def ffmpeg_command(*args: str) -> list[str]:
+    ffmpeg = ffmpeg_path()
+    if not ffmpeg:
+        raise FileNotFoundError("ffmpeg isn't installed.")
+    return [ffmpeg, "-hide_banner", "-nostdin", "-y", "-loglevel", "error", *args]
+
+
+def run_ffmpeg(*args: str) -> subprocess.CompletedProcess:
+    result = subprocess.run(
+        ffmpeg_command(*args),
+        capture_output = True,
+        text           = True,
+        creationflags  = CREATE_NO_WINDOW,
+    )
+    if result.returncode != 0:
+        raise IOError(f"ffmpeg exited with code {result.returncode}: {result.stderr.strip()}")
+    return result
+
+
+def mux(video_path, audio_path, output_path):
+    """
+    Combines a video-only and an audio-only file into `output_path` without
+    re-encoding either of them.
+    """
+    output_path = Path(output_path)
+    tmp_path    = output_path.with_name(f"{output_path.stem}.muxing{output_path.suffix}")
+    run_ffmpeg(
+        "-i", str(video_path),
+        "-i", str(audio_path),
+        "-map", "0:v:0",
+        "-map", "1:a:0",
+        "-c", "copy",
+        str(tmp_path),
+    )
+    os.replace(tmp_path, output_path)
+
+
+def to_mp3(input_path, duration: float = None, on_progress = None) -> str:
+    """
+    Transcodes `input_path` to an mp3 next to it, removes the original and
+    returns the new path. `on_progress(fraction)` is called as ffmpeg goes
+    through the file when the `duration` in seconds is known.
+    """
+    input_path  = Path(input_path)
+    output_path = input_path.with_suffix(".mp3")
+    tmp_path    = output_path.with_name(f"{output_path.stem}.converting.mp3")
+    process     = subprocess.Popen(
+        ffmpeg_command(
+            "-i", str(input_path),
+            "-vn",
+            "-c:a", "libmp3lame",
+            "-q:a", MP3_QUALITY,
+            "-progress", "pipe:1",
+            "-nostats",
+            str(tmp_path),
+        ),
+        stdout        = subprocess.PIPE,
+        stderr        = subprocess.PIPE,
+        text          = True,
+        creationflags = CREATE_NO_WINDOW,
+    )
+    for line in process.stdout:
+        key, _, value = line.strip().partition("=")
+        if key == "out_time_us" and value.isdigit() and duration and on_progress:
+            on_progress(min(int(value) / 1_000_000 / duration, 1.0))
+    errors = process.stderr.read()
+    if process.wait() != 0:
+        if tmp_path.exists():
+            os.remove(tmp_path)
+        raise IOError(f"ffmpeg exited with code {process.returncode}: {errors.strip()}")
+
+    os.replace(tmp_path, output_path)
+    os.remove(input_path)
+    if on_progress:
+        on_progress(1.0)
+    return str(output_path)
+
+
+def decode_image(path):
+    img = cv2.imread(str(path), cv2.IMREAD_UNCHANGED)
+    img = cv2.cvtColor(img, cv2.COLOR_BGR2RGBA)
+    return np.ascontiguousarray(img, dtype=np.uint8)
+
+
+def decode_image_bytes(data: bytes, size: tuple[int, int] = None):
+    """
+    Decodes an encoded image (jpg, png, webp...) straight from memory into
+    an RGBA array, optionally downscaled to `size` (width, height).
+    """
+    img = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if img is None:
+        raise ValueError("Unsupported or corrupted image data.")
+    if size:
+        img = cv2.resize(img, size, interpolation = cv2.INTER_AREA)
+    img = cv2.cvtColor(img, cv2.COLOR_BGR2RGBA)
+    return np.ascontiguousarray(img, dtype=np.uint8)
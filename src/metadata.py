@@ -0,0 +1,221 @@
+import hashlib
+import json
+import os
+
+from collections          import OrderedDict
+from concurrent.futures   import ThreadPoolExecutor, as_completed
+from pathlib              import Path
+from pytubefix            import YouTube as YT, Channel, Playlist, extract
+from pytubefix.innertube  import InnerTube
+from src                  import metrics, utils
+from threading            import Lock
+from time                 import time
+
+LOG         = utils.LOGGER()
+DEFAULT_TTL = 3600
+
+
+class DiskStore:
+    """
+    Small on-disk JSON store, one file per entry. Entries older than `ttl`
+    seconds are treated as missing and removed on read.
+    """
+    def __init__(self, folder, ttl: int = DEFAULT_TTL):
+        self.folder = Path(folder)
+        self.ttl    = ttl
+
+    def _path(self, kind: str, key: str) -> Path:
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        return self.folder / f"{kind}_{digest}.json"
+
+    def get(self, kind: str, key: str):
+        path = self._path(kind, key)
+        try:
+            with open(path, "r", encoding = "utf-8") as f:
+                entry = json.load(f)
+            if time() - entry["saved_at"] <= self.ttl:
+                return entry["data"]
+            os.remove(path)
+        except (OSError, ValueError, KeyError):
+            pass
+        return None
+
+    def set(self, kind: str, key: str, data):
+        try:
+            os.makedirs(self.folder, exist_ok = True)
+            path     = self._path(kind, key)
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "w", encoding = "utf-8") as f:
+                json.dump({"saved_at": time(), "data": data}, f)
+            os.replace(tmp_path, path)
+        except (OSError, TypeError, ValueError) as e:
+            LOG.warning(f"Failed to write {kind} metadata to the cache: {e}")
+
+
+class MetadataCache:
+    """
+    Resolves each video, playlist and channel once and shares the result
+    between link validation, the info panel and the downloaders.
+
+    Live pytubefix objects are kept in an in-process LRU keyed by id. When
+    `cache_dir` is set, serialized metadata and stream manifests are also
+    persisted there for `ttl` seconds so they survive a restart.
+    """
+    def __init__(self, max_objects: int = 256, cache_dir = None, ttl: int = DEFAULT_TTL):
+        self.max_objects = max_objects
+        self.ttl         = ttl
+        self.store       = DiskStore(cache_dir, ttl) if cache_dir else None
+        self._objects    = OrderedDict()
+        self._lock       = Lock()
+
+    def _get_object(self, key: tuple, factory):
+        with self._lock:
+            entry = self._objects.get(key)
+            if entry and time() - entry[0] <= self.ttl:
+                self._objects.move_to_end(key)
+                return entry[1]
+
+        obj = factory()
+        with self._lock:
+            self._objects[key] = (time(), obj)
+            self._objects.move_to_end(key)
+            while len(self._objects) > self.max_objects:
+                self._objects.popitem(last = False)
+        return obj
+
+    def clear(self):
+        with self._lock:
+            self._objects.clear()
+
+    def video(self, url: str) -> YT:
+        video_id = extract.video_id(url)
+
+        def factory():
+            yt = YT(f"https://www.youtube.com/watch?v={video_id}")
+            manifest = self.store.get("manifest", video_id) if self.store else None
+            # streams from clients that need a poToken can't be replayed.
+            if manifest and not InnerTube(manifest["client"]).require_po_token:
+                yt.client   = manifest["client"]
+                yt.vid_info = manifest["vid_info"]
+            return yt
+
+        return self._get_object(("video", video_id), factory)
+
+    def playlist(self, url: str) -> Playlist:
+        playlist_id = extract.playlist_id(url)
+        return self._get_object(
+            ("playlist", playlist_id),
+            lambda: Playlist(f"https://www.youtube.com/playlist?list={playlist_id}")
+        )
+
+    def channel_name(self, channel_url: str) -> str:
+        with metrics.stage("channel"):
+            name = self.store.get("channel", channel_url) if self.store else None
+            if name is None:
+                name = self._get_object(("channel", channel_url), lambda: Channel(channel_url)).channel_name
+                if self.store:
+                    self.store.set("channel", channel_url, name)
+        return name
+
+    def video_details(self, url: str) -> dict:
+        """
+        Returns the video metadata shown in the info panel, from the disk
+        store if it's still fresh.
+        """
+        video_id = extract.video_id(url)
+        details  = self.store.get("video", video_id) if self.store else None
+        if details:
+            return details
+
+        yt      = self.video(url)
+        details = {
+            "id": video_id,
+            "title": yt.title,
+            "thumbnail_url": yt.thumbnail_url,
+            "length": yt.length,
+            "views": yt.views,
+            "publish_date": yt.publish_date.isoformat() if yt.publish_date else None,
+            "channel_url": yt.channel_url,
+            "channel_name": self.channel_name(yt.channel_url),
+        }
+        if self.store:
+            self.store.set("video", video_id, details)
+            self.store.set("manifest", video_id, {"client": yt.client, "vid_info": yt.vid_info})
+        return details
+
+
+class PlaylistInfoLoader:
+    """
+    Resolves the title and length of every video in a playlist on a bounded
+    worker pool and publishes running totals as each entry comes in, instead
+    of walking `playlist.videos` one network round-trip at a time.
+
+    Entries are resolved through `metadata_cache` when given, so the videos
+    don't have to be resolved again when the playlist is downloaded.
+    """
+    def __init__(self, max_workers: int = 8, metadata_cache: MetadataCache = None):
+        self.max_workers = max_workers
+        self.cache       = metadata_cache
+        self.lock        = Lock()
+        self.entries     = []
+        self.total       = 0
+        self.resolved    = 0
+        self.failed      = 0
+        self.duration    = 0
+        self.cancelled   = False
+        self._pool       = None
+
+    @property
+    def video_count(self) -> int:
+        return self.resolved - self.failed
+
+    def snapshot(self) -> list[dict]:
+        with self.lock:
+            return sorted(self.entries, key = lambda e: e["index"])
+
+    def cancel(self):
+        self.cancelled = True
+        if self._pool:
+            self._pool.shutdown(wait = False, cancel_futures = True)
+
+    def load(self, video_urls, on_entry = None):
+        """
+        Resolves `video_urls` and calls `on_entry(loader, entry)` from the
+        calling thread every time an entry finishes. Entries that fail to
+        resolve are counted in `failed` and skipped.
+        """
+        urls       = list(video_urls)
+        self.total = len(urls)
+        self._pool = ThreadPoolExecutor(max_workers = self.max_workers, thread_name_prefix = "ytd_meta")
+        try:
+            futures = [self._pool.submit(self._resolve, i, url) for i, url in enumerate(urls)]
+            for future in as_completed(futures):
+                if self.cancelled:
+                    break
+                try:
+                    entry = future.result()
+                except Exception as e:
+                    LOG.warning(f"Failed to load playlist entry: {e}")
+                    entry = None
+
+                with self.lock:
+                    self.resolved += 1
+                    if entry:
+                        self.entries.append(entry)
+                        self.duration += entry["length"]
+                    else:
+                        self.failed += 1
+
+                if entry and on_entry:
+                    on_entry(self, entry)
+        finally:
+            self._pool.shutdown(wait = False, cancel_futures = True)
+
+    def _resolve(self, index: int, url: str) -> dict:
+        vid = self.cache.video(url) if self.cache else YT(url)
+        return {
+            "index": index,
+            "url": url,
+            "title": vid.title,
+            "length": vid.length or 0,
+        }
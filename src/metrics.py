@@ -0,0 +1,298 @@
+import json
+import os
+
+from bisect     import bisect_left
+from contextlib import contextmanager
+from pathlib    import Path
+from src        import utils
+from threading  import Event, Lock, Thread
+from time       import monotonic, time
+
+LOG             = utils.LOGGER()
+EXPORT_INTERVAL = 15.0
+# seconds, from a cached lookup to a long transfer.
+TIME_BUCKETS    = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+# bytes per second, 64 KB/s to 1 GB/s.
+SPEED_BUCKETS   = tuple(65536 * 2 ** i for i in range(15))
+
+
+def _label_key(labels: dict) -> tuple:
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(key: tuple, extra: dict = None) -> str:
+    pairs = [*key, *(extra or {}).items()]
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{value}"' for name, value in pairs) + "}"
+
+
+class Counter:
+    """
+    Value that only goes up, one per combination of labels.
+    """
+    kind = "counter"
+
+    def __init__(self, name: str, help: str):
+        self.name    = name
+        self.help    = help
+        self._values = {}
+        self._lock   = Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(_label_key(labels), 0)
+
+    def snapshot(self) -> list[dict]:
+        with self._lock:
+            return [{"labels": dict(key), "value": value} for key, value in self._values.items()]
+
+    def prometheus(self) -> list[str]:
+        with self._lock:
+            return [f"{self.name}{_format_labels(key)} {value}" for key, value in self._values.items()]
+
+
+class Gauge(Counter):
+    """
+    Value that can go up and down, e.g. the length of a queue.
+    """
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[_label_key(labels)] = value
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+
+class HistogramSeries:
+    def __init__(self, buckets: tuple):
+        self.counts = [0] * (len(buckets) + 1)
+        self.count  = 0
+        self.sum    = 0.0
+
+
+class Histogram:
+    """
+    Distribution of observed values over fixed `buckets` (upper bounds), one
+    per combination of labels. Quantiles are estimated from the buckets the
+    same way Prometheus does.
+    """
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, buckets: tuple = TIME_BUCKETS):
+        self.name    = name
+        self.help    = help
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock   = Lock()
+
+    def observe(self, value: float, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = HistogramSeries(self.buckets)
+            series.counts[bisect_left(self.buckets, value)] += 1
+            series.count += 1
+            series.sum   += value
+
+    @contextmanager
+    def time(self, **labels):
+        """
+        Observes how long the block takes, in seconds, even if it raises.
+        """
+        started = monotonic()
+        try:
+            yield
+        finally:
+            self.observe(monotonic() - started, **labels)
+
+    def _quantile(self, series: HistogramSeries, q: float) -> float:
+        if not series.count:
+            return 0.0
+        rank  = q * series.count
+        total = 0
+        for i, count in enumerate(series.counts):
+            if total + count >= rank and count:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                if i == len(self.buckets):
+                    return lower
+                return lower + (self.buckets[i] - lower) * (rank - total) / count
+            total += count
+        return self.buckets[-1]
+
+    def summary(self, **labels) -> dict:
+        with self._lock:
+            series = self._series.get(_label_key(labels))
+            if series is None:
+                return {"count": 0, "sum": 0.0, "avg": 0.0, "p50": 0.0, "p95": 0.0}
+            return {
+                "count": series.count,
+                "sum": series.sum,
+                "avg": series.sum / series.count,
+                "p50": self._quantile(series, 0.5),
+                "p95": self._quantile(series, 0.95),
+            }
+
+    def label_sets(self) -> list[dict]:
+        with self._lock:
+            return [dict(key) for key in self._series]
+
+    def snapshot(self) -> list[dict]:
+        return [{"labels": labels, **self.summary(**labels)} for labels in self.label_sets()]
+
+    def prometheus(self) -> list[str]:
+        lines = []
+        with self._lock:
+            for key, series in self._series.items():
+                total = 0
+                for bound, count in zip((*self.buckets, "+Inf"), series.counts):
+                    total += count
+                    lines.append(f"{self.name}_bucket{_format_labels(key, {'le': bound})} {total}")
+                lines.append(f"{self.name}_sum{_format_labels(key)} {series.sum}")
+                lines.append(f"{self.name}_count{_format_labels(key)} {series.count}")
+        return lines
+
+
+class Registry:
+    """
+    Holds every metric and exports them all at once, as JSON or in the
+    Prometheus text format (for node_exporter's textfile collector).
+    """
+    def __init__(self):
+        self.metrics = {}
+        self._lock   = Lock()
+
+    def _add(self, metric):
+        with self._lock:
+            return self.metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, help: str) -> Counter:
+        return self._add(Counter(name, help))
+
+    def gauge(self, name: str, help: str) -> Gauge:
+        return self._add(Gauge(name, help))
+
+    def histogram(self, name: str, help: str, buckets: tuple = TIME_BUCKETS) -> Histogram:
+        return self._add(Histogram(name, help, buckets))
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            metrics = list(self.metrics.values())
+        return {
+            "timestamp": time(),
+            "metrics": {metric.name: {"type": metric.kind, "help": metric.help, "values": metric.snapshot()} for metric in metrics},
+        }
+
+    def prometheus(self) -> str:
+        with self._lock:
+            metrics = list(self.metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines += metric.prometheus()
+        return "\n".join(lines) + "\n"
+
+    def write(self, folder):
+        """
+        Writes `metrics.json` and `metrics.prom` to `folder`. Each file is
+        replaced atomically so readers never see half of it.
+        """
+        folder = Path(folder)
+        folder.mkdir(parents = True, exist_ok = True)
+        for name, text in (
+            ("metrics.json", json.dumps(self.snapshot(), indent = 2)),
+            ("metrics.prom", self.prometheus()),
+        ):
+            tmp_path = folder / f"{name}.tmp"
+            with open(tmp_path, "w", encoding = "utf-8") as f:
+                f.write(text)
+            os.replace(tmp_path, folder / name)
+
+
+class Exporter:
+    """
+    Writes `registry` to `folder` every `interval` seconds on a background
+    thread, and once more when stopped.
+    """
+    def __init__(self, registry: Registry, folder, interval: float = EXPORT_INTERVAL):
+        self.registry = registry
+        self.folder   = folder
+        self.interval = interval
+        self._stop    = Event()
+        self._thread  = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = Thread(target = self._run, name = "ytd_metrics", daemon = True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+        self.export()
+
+    def export(self):
+        try:
+            self.registry.write(self.folder)
+        except OSError as e:
+            LOG.warning(f"Failed to export metrics: {e}")
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.export()
+
+
+REGISTRY = Registry()
+STAGES   = ("resolve", "channel", "select", "first_byte", "transfer", "postprocess")
+
+STAGE_SECONDS  = REGISTRY.histogram("ytd_stage_seconds", "Time spent in each stage of a download.")
+TRANSFER_SPEED = REGISTRY.histogram("ytd_transfer_bytes_per_second", "Average speed of each stream transfer.", SPEED_BUCKETS)
+BYTES          = REGISTRY.counter("ytd_downloaded_bytes_total", "Bytes downloaded.")
+RETRIES        = REGISTRY.counter("ytd_retries_total", "Requests retried, by reason.")
+ITEMS          = REGISTRY.counter("ytd_items_total", "Videos processed, by outcome.")
+QUEUE_DEPTH    = REGISTRY.gauge("ytd_queue_depth", "Items waiting in each queue.")
+
+
+def stage(name: str):
+    """
+    Times the block as stage `name`.
+    """
+    return STAGE_SECONDS.time(stage = name)
+
+
+class TransferTimer:
+    """
+    Records one stream transfer: time to the first byte, total transfer
+    time, bytes received and average speed. `add(size)` is called for every
+    chunk received, from any thread, and `done()` once it's complete.
+    """
+    def __init__(self):
+        self.started  = monotonic()
+        self.received = 0
+        self._lock    = Lock()
+
+    def add(self, size: int):
+        with self._lock:
+            first = self.received == 0
+            self.received += size
+        if first:
+            STAGE_SECONDS.observe(monotonic() - self.started, stage = "first_byte")
+        BYTES.inc(size)
+
+    def done(self):
+        elapsed = monotonic() - self.started
+        STAGE_SECONDS.observe(elapsed, stage = "transfer")
+        if self.received and elapsed > 0:
+            TRANSFER_SPEED.observe(self.received / elapsed)
@@ -0,0 +1,78 @@
+import requests
+
+from requests.adapters import HTTPAdapter
+from src               import metrics, utils
+from threading         import Lock
+from urllib3.util      import Retry
+
+LOG             = utils.LOGGER()
+POOL_SIZE       = 32
+CONNECT_TIMEOUT = 10
+READ_TIMEOUT    = 30
+RETRIES         = 3
+BACKOFF         = 0.5
+
+_session      = None
+_session_lock = Lock()
+
+
+class CountingRetry(Retry):
+    """
+    `Retry` that counts every retry in `metrics.RETRIES`, redirects aside.
+    """
+    def increment(self, *args, **kwargs):
+        response = kwargs.get("response")
+        if response is None:
+            metrics.RETRIES.inc(reason = "connection")
+        elif not response.get_redirect_location():
+            metrics.RETRIES.inc(reason = f"http_{response.status}")
+        return super().increment(*args, **kwargs)
+
+
+def new_session(pool_size: int = POOL_SIZE, retries: int = RETRIES) -> requests.Session:
+    """
+    Session keeping up to `pool_size` connections alive per host. Failed
+    connections and 429/5xx answers to GET and HEAD requests are retried
+    `retries` times with exponential backoff.
+    """
+    retry = CountingRetry(
+        total                      = retries,
+        backoff_factor             = BACKOFF,
+        status_forcelist           = (429, 500, 502, 503, 504),
+        allowed_methods            = ("GET", "HEAD"),
+        respect_retry_after_header = True,
+        raise_on_status            = False,
+    )
+    adapter = HTTPAdapter(pool_connections = pool_size, pool_maxsize = pool_size, max_retries = retry)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def session() -> requests.Session:
+    """
+    The session shared by every request the app makes itself.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = new_session()
+    return _session
+
+
+def configure(pool_size: int = POOL_SIZE, retries: int = RETRIES):
+    """
+    Replaces the shared session, e.g. to fit the pool to the number of
+    parallel connections. Requests already running keep their session.
+    """
+    global _session
+    with _session_lock:
+        _session = new_session(pool_size, retries)
+    LOG.info(f"HTTP pool size set to {pool_size}.")
+
+
+def get(url: str, **kwargs) -> requests.Response:
+    kwargs.setdefault("timeout", (CONNECT_TIMEOUT, READ_TIMEOUT))
+    return session().get(url, **kwargs)
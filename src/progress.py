@@ -0,0 +1,184 @@
+from itertools import count
+from src       import utils
+from threading import Lock
+from time      import monotonic, time
+
+LOG = utils.LOGGER()
+
+QUEUED    = "queued"
+RUNNING   = "running"
+DONE      = "done"
+SKIPPED   = "skipped"
+FAILED    = "failed"
+CANCELLED = "cancelled"
+
+
+class JobState:
+    """
+    Progress of one download job (a video or a whole playlist), written by
+    the download workers and read by the UI or the CLI through `snapshot()`.
+
+    A job is made of items, one per file. Overall progress is the mean of the
+    item fractions, so a playlist isn't measured against a single file's size.
+    Finished items are folded into counters so a job's size stays constant
+    however many items it has.
+    """
+    def __init__(self, bus: "ProgressBus", job_id: int, title: str, kind: str, items_total: int = 1):
+        self.bus         = bus
+        self.job_id      = job_id
+        self.title       = title
+        self.kind        = kind
+        self.state       = QUEUED
+        self.status      = "Queued."
+        self.items_total = items_total
+        self.started_at  = None
+        self.finished_at = None
+        self._items      = {}
+        self._done       = 0
+        self._failed     = 0
+        self._bytes_done = 0
+        self._bytes      = 0
+        self._lock       = Lock()
+
+    def set_status(self, status: str, state: str = None):
+        with self._lock:
+            self.status = status
+            if state:
+                self.state = state
+                if state == RUNNING and self.started_at is None:
+                    self.started_at = time()
+                elif state in (DONE, FAILED, CANCELLED):
+                    self.finished_at = time()
+        self.bus.publish(self, force = True)
+
+    def set_items_total(self, items_total: int):
+        with self._lock:
+            self.items_total = max(items_total, 1)
+        self.bus.publish(self, force = True)
+
+    def item_started(self, key, title: str, total: int):
+        with self._lock:
+            self._items[key] = {"title": title, "done": 0, "total": total}
+        self.bus.publish(self, force = True)
+
+    def item_progress(self, key, size: int):
+        with self._lock:
+            item = self._items.get(key)
+            if item:
+                item["done"] += size
+        self.bus.publish(self)
+
+    def item_converting(self, key, fraction: float):
+        """
+        Reports post-processing of a downloaded item, its progress restarts
+        from `fraction` instead of counting bytes.
+        """
+        with self._lock:
+            item = self._items.get(key)
+            if item:
+                item["converting"] = fraction
+        self.bus.publish(self, force = fraction == 0.0)
+
+    def item_finished(self, key, state: str = DONE, title: str = None):
+        with self._lock:
+            item = self._items.pop(key, None)
+            self._done += 1
+            if state == FAILED:
+                self._failed += 1
+            if item:
+                self._bytes_done += item["done"]
+                self._bytes      += item["total"]
+        self.bus.publish(self, force = True)
+
+    @staticmethod
+    def _fraction(item: dict) -> float:
+        if "converting" in item:
+            return item["converting"]
+        return min(item["done"] / item["total"], 1.0) if item["total"] > 0 else 0.0
+
+    def snapshot(self) -> dict:
+        """
+        Returns a consistent copy of the job's state.
+        """
+        with self._lock:
+            active    = list(self._items.values())
+            fractions = self._done + sum(self._fraction(i) for i in active)
+            return {
+                "job_id": self.job_id,
+                "title": self.title,
+                "kind": self.kind,
+                "state": self.state,
+                "status": self.status,
+                "progress": min(fractions / max(self.items_total, 1), 1.0),
+                "bytes_done": self._bytes_done + sum(i["done"] for i in active),
+                "bytes_total": self._bytes + sum(i["total"] for i in active),
+                "items_done": self._done,
+                "items_failed": self._failed,
+                "items_total": self.items_total,
+                "active_items": [
+                    (f"{i['title']} (converting)" if "converting" in i else i["title"], self._fraction(i))
+                    for i in active
+                ],
+                "started_at": self.started_at,
+                "finished_at": self.finished_at,
+            }
+
+
+class ProgressBus:
+    """
+    Keeps every `JobState` and notifies subscribers when one changes.
+    Byte progress is coalesced to at most one notification per job every
+    `interval` seconds, state changes are always delivered.
+
+    Subscribers are called from the worker threads with a job snapshot and
+    must not block.
+    """
+    def __init__(self, interval: float = 0.1):
+        self.interval     = interval
+        self._ids         = count(1)
+        self._jobs        = {}
+        self._last        = {}
+        self._subscribers = []
+        self._lock        = Lock()
+
+    def create_job(self, title: str, kind: str = "video", items_total: int = 1) -> JobState:
+        with self._lock:
+            job = JobState(self, next(self._ids), title, kind, items_total)
+            self._jobs[job.job_id] = job
+        self.publish(job, force = True)
+        return job
+
+    def remove_job(self, job_id: int):
+        with self._lock:
+            self._jobs.pop(job_id, None)
+            self._last.pop(job_id, None)
+
+    def jobs(self) -> list[dict]:
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return [job.snapshot() for job in jobs]
+
+    def subscribe(self, callback):
+        with self._lock:
+            self._subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        with self._lock:
+            if callback in self._subscribers:
+                self._subscribers.remove(callback)
+
+    def publish(self, job: JobState, force: bool = False):
+        now = monotonic()
+        with self._lock:
+            if not force and now - self._last.get(job.job_id, 0) < self.interval:
+                return
+            self._last[job.job_id] = now
+            subscribers = list(self._subscribers)
+        if not subscribers:
+            return
+        snapshot = job.snapshot()
+        for callback in subscribers:
+            try:
+                callback(snapshot)
+            except Exception as e:
+                LOG.error(f"Progress subscriber failed: {e}")
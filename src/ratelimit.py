@@ -0,0 +1,102 @@
+from threading import Lock
+from time      import monotonic, sleep
+
+BURST_SECONDS = 0.5
+UNITS         = {"": 1, "K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+
+
+def parse_rate(value: str) -> int:
+    """
+    Parses a rate like "500K", "2M" or "1048576" into bytes per second.
+    "0" means unlimited.
+    """
+    value = value.strip().upper().removesuffix("/S").removesuffix("B")
+    unit  = value[-1:] if value[-1:] in UNITS else ""
+    return int(float(value[:len(value) - len(unit)]) * UNITS[unit])
+
+
+class TokenBucket:
+    """
+    Token bucket holding up to `burst` seconds worth of `rate` bytes per
+    second. A rate of 0 disables the bucket so it never throttles.
+
+    Callers reserve tokens for what they just transferred and sleep for the
+    returned time, so concurrent downloads sharing a bucket are paced
+    together instead of each sleeping a fixed amount.
+    """
+    def __init__(self, rate: int = 0, burst: float = BURST_SECONDS):
+        self.burst   = burst
+        self._rate   = 0
+        self._tokens = 0.0
+        self._stamp  = monotonic()
+        self._lock   = Lock()
+        self.set_rate(rate)
+
+    @property
+    def rate(self) -> int:
+        return self._rate
+
+    def set_rate(self, rate: int):
+        """
+        Changes the rate, takes effect for the next reservation.
+        """
+        with self._lock:
+            now = monotonic()
+            if self._rate:
+                self._refill(now)
+            else:
+                self._tokens = 0.0
+            self._stamp  = now
+            self._rate   = max(0, int(rate))
+            self._tokens = min(self._tokens, self._rate * self.burst)
+
+    def _refill(self, now: float):
+        self._tokens = min(self._tokens + (now - self._stamp) * self._rate, self._rate * self.burst)
+        self._stamp  = now
+
+    def reserve(self, size: int) -> float:
+        """
+        Takes `size` tokens and returns how long the caller has to wait for
+        the bucket to pay them back.
+        """
+        if not self._rate:
+            return 0.0
+        with self._lock:
+            if not self._rate:
+                return 0.0
+            self._refill(monotonic())
+            self._tokens -= size
+            return -self._tokens / self._rate if self._tokens < 0 else 0.0
+
+
+class RateLimiter:
+    """
+    Global bandwidth cap shared by every download, plus optional per-job
+    buckets from `job_bucket()`. Both can be changed while downloads run.
+    """
+    def __init__(self, rate: int = 0):
+        self.bucket = TokenBucket(rate)
+
+    @property
+    def rate(self) -> int:
+        return self.bucket.rate
+
+    def set_rate(self, rate: int):
+        self.bucket.set_rate(rate)
+
+    def job_bucket(self, rate: int = 0) -> TokenBucket:
+        return TokenBucket(rate)
+
+    def throttle(self, size: int, job_bucket: TokenBucket = None):
+        """
+        Blocks until `size` bytes fit under the global cap and `job_bucket`'s.
+        Returns immediately when no limit is set.
+        """
+        wait = self.bucket.reserve(size)
+        if job_bucket:
+            wait = max(wait, job_bucket.reserve(size))
+        if wait > 0:
+            sleep(wait)
+
+
+LIMITER = RateLimiter()
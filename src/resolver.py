@@ -0,0 +1,96 @@
+import multiprocessing
+import os
+import pytubefix
+
+from concurrent.futures import ProcessPoolExecutor
+from src                import metrics, network, utils
+
+LOG = utils.LOGGER()
+
+
+class StreamInfo:
+    """
+    Picklable copy of the parts of a pytubefix `Stream` the downloaders use,
+    with the signature and n parameter already deciphered into `url`.
+    """
+    def __init__(self, video_id: str, title: str, url: str, itag: int, filesize: int, default_filename: str, durationMs: str = None):
+        self.video_id         = video_id
+        self.title            = title
+        self.url              = url
+        self.itag             = itag
+        self.filesize         = filesize
+        self.default_filename = default_filename
+        self.durationMs       = durationMs
+
+    @classmethod
+    def from_stream(cls, video_id: str, stream) -> "StreamInfo":
+        return cls(
+            video_id,
+            stream.title,
+            stream.url,
+            stream.itag,
+            stream.filesize,
+            stream.default_filename,
+            getattr(stream, "durationMs", None),
+        )
+
+    def get_file_path(self, filename: str) -> str:
+        return filename
+
+    def iter_chunks(self, chunk_size: int):
+        with network.get(self.url, stream = True) as response:
+            response.raise_for_status()
+            yield from response.iter_content(chunk_size)
+
+
+def _init_worker(js_url: str, js: str, cache_dir):
+    from src import cipher_cache
+
+    # hand the parent's player JS to pytubefix's own cache so the worker
+    # doesn't download it again.
+    if js_url and js:
+        pytubefix.__js_url__ = js_url
+        pytubefix.__js__     = js
+    cipher_cache.install(cache_dir)
+
+
+def _resolve(url: str, audio_only: bool, resolution: str) -> list[StreamInfo]:
+    from src import downloader
+
+    try:
+        yt      = pytubefix.YouTube(url)
+        streams = downloader.get_streams(yt, audio_only, resolution)
+        return [StreamInfo.from_stream(yt.video_id, stream) for stream in streams]
+    except Exception as e:
+        # pytubefix exceptions don't all survive pickling.
+        raise RuntimeError(f"{type(e).__name__}: {e}") from None
+
+
+class ProcessResolver:
+    """
+    Resolves stream manifests on a pool of `processes` worker processes so
+    signature deciphering and manifest parsing run on every core instead of
+    being serialized by the GIL. Results come back as `StreamInfo` lists,
+    like `downloader.get_streams()`.
+
+    The player JS already loaded in this process, if any, is shared with the
+    workers when the pool starts, and the workers share deciphered players
+    through the cipher cache in `cache_dir`. Call `close()` when done.
+    """
+    def __init__(self, processes: int = None, cache_dir = None):
+        self.processes = max(1, processes or os.cpu_count() or 1)
+        self._pool     = ProcessPoolExecutor(
+            max_workers = self.processes,
+            mp_context  = multiprocessing.get_context("spawn"),
+            initializer = _init_worker,
+            initargs    = (pytubefix.__js_url__, pytubefix.__js__, cache_dir),
+        )
+        LOG.info(f"Resolving streams on {self.processes} processes.")
+
+    def resolve(self, url: str, audio_only: bool = False, resolution: str = None) -> list[StreamInfo]:
+        # covers stream selection too, it happens in the worker.
+        with metrics.stage("resolve"):
+            return self._pool.submit(_resolve, url, audio_only, resolution).result()
+
+    def close(self):
+        self._pool.shutdown(wait = False, cancel_futures = True)
@@ -0,0 +1,137 @@
+"""
+Offline parsing of YouTube links. Works out what a link points to and its
+canonical form without any network request, the metadata is only fetched
+once the link is known to be valid.
+"""
+import re
+
+from urllib.parse import parse_qs, urlsplit
+
+VIDEO    = "video"
+SHORT    = "short"
+PLAYLIST = "playlist"
+CHANNEL  = "channel"
+
+VIDEO_ID    = re.compile(r"^[A-Za-z0-9_-]{11}$")
+PLAYLIST_ID = re.compile(r"^[A-Za-z0-9_-]{12,}$")
+CHANNEL_ID  = re.compile(r"^UC[A-Za-z0-9_-]{22}$")
+HANDLE      = re.compile(r"^@[\w.-]{3,30}$")
+HOSTS       = {
+    "youtube.com",
+    "www.youtube.com",
+    "m.youtube.com",
+    "music.youtube.com",
+    "youtube-nocookie.com",
+    "www.youtube-nocookie.com",
+}
+SHORT_HOSTS = {"youtu.be", "www.youtu.be"}
+# path prefixes followed by a video id.
+VIDEO_PATHS = {"embed", "v", "e", "live", "shorts"}
+# legacy channel urls, followed by a custom name.
+NAMED_CHANNEL_PATHS = {"c", "user"}
+
+
+class ParsedUrl:
+    """
+    What a YouTube link points to. `kind` is one of `VIDEO`, `SHORT`,
+    `PLAYLIST` or `CHANNEL`. A video opened from a playlist keeps its
+    `playlist_id` but is still a video.
+    """
+    def __init__(self, kind: str, video_id: str = None, playlist_id: str = None, channel: str = None):
+        self.kind        = kind
+        self.video_id    = video_id
+        self.playlist_id = playlist_id
+        self.channel     = channel
+
+    def __repr__(self) -> str:
+        return f"ParsedUrl({self.kind!r}, video_id={self.video_id!r}, playlist_id={self.playlist_id!r}, channel={self.channel!r})"
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, ParsedUrl) and vars(self) == vars(other)
+
+    @property
+    def url(self) -> str:
+        """
+        Canonical link, without tracking or timestamp parameters.
+        """
+        if self.kind in (VIDEO, SHORT):
+            return f"https://www.youtube.com/watch?v={self.video_id}"
+        if self.kind == PLAYLIST:
+            return f"https://www.youtube.com/playlist?list={self.playlist_id}"
+        if self.channel.startswith(("@", "c/", "user/")):
+            return f"https://www.youtube.com/{self.channel}"
+        return f"https://www.youtube.com/channel/{self.channel}"
+
+
+def _match(pattern: re.Pattern, value: str) -> str:
+    return value if value and pattern.match(value) else None
+
+
+def parse(url: str) -> ParsedUrl:
+    """
+    Parses any form of YouTube link (watch, youtu.be, shorts, embed, live,
+    playlist and channel links, with or without scheme). Returns `None`
+    if it isn't one.
+    """
+    url = str(url or "").strip()
+    if not url:
+        return None
+    if "://" not in url:
+        url = f"https://{url}"
+    try:
+        parts = urlsplit(url)
+    except ValueError:
+        return None
+
+    host        = (parts.hostname or "").lower()
+    segments    = [s for s in parts.path.split("/") if s]
+    query       = parse_qs(parts.query)
+    video_id    = _match(VIDEO_ID, query.get("v", [None])[0])
+    playlist_id = _match(PLAYLIST_ID, query.get("list", [None])[0])
+
+    if host in SHORT_HOSTS:
+        video_id = _match(VIDEO_ID, segments[0]) if segments else None
+        return ParsedUrl(VIDEO, video_id, playlist_id) if video_id else None
+    if host not in HOSTS:
+        return None
+
+    if not segments:
+        return None
+    head = segments[0]
+    if head == "watch":
+        if video_id:
+            return ParsedUrl(VIDEO, video_id, playlist_id)
+        return ParsedUrl(PLAYLIST, playlist_id = playlist_id) if playlist_id else None
+    if head == "playlist":
+        return ParsedUrl(PLAYLIST, playlist_id = playlist_id) if playlist_id else None
+    if head in VIDEO_PATHS and len(segments) > 1:
+        video_id = _match(VIDEO_ID, segments[1])
+        if not video_id:
+            return None
+        return ParsedUrl(SHORT if head == "shorts" else VIDEO, video_id, playlist_id)
+    if head == "channel" and len(segments) > 1:
+        channel = _match(CHANNEL_ID, segments[1])
+        return ParsedUrl(CHANNEL, channel = channel) if channel else None
+    if head in NAMED_CHANNEL_PATHS and len(segments) > 1:
+        return ParsedUrl(CHANNEL, channel = f"{head}/{segments[1]}")
+    if _match(HANDLE, head):
+        return ParsedUrl(CHANNEL, channel = head)
+    return None
+
+
+def normalize(url: str) -> str:
+    """
+    Canonical form of `url`, `None` if it isn't a YouTube link.
+    """
+    parsed = parse(url)
+    return parsed.url if parsed else None
+
+
+def is_video_url(url: str) -> bool:
+    parsed = parse(url)
+    return parsed is not None and parsed.kind in (VIDEO, SHORT)
+
+
+def is_playlist_url(url: str) -> bool:
+    parsed = parse(url)
+    return parsed is not None and parsed.kind == PLAYLIST
@@ -1,27 +1,180 @@
+import atexit
+import importlib
+import json
 import logging
 import logging.handlers
 import os
 import platform
 import sys
 
+from queue     import SimpleQueue
+from threading import Lock
+from time      import monotonic, perf_counter
+
 
 def executable_path():
     return os.path.dirname(os.path.abspath(sys.argv[0]))
 
 
+class LazyModule:
+    """
+    Stands in for a module and only imports it the first time one of its
+    attributes is accessed. Safe to use from multiple threads. PyInstaller
+    can't see these imports, every module loaded this way has to be listed
+    as a hidden import in the release workflow.
+    """
+    def __init__(self, name: str):
+        self._name   = name
+        self._module = None
+        self._lock   = Lock()
+
+    def load(self):
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    self._module = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, attr: str):
+        return getattr(self.load(), attr)
+
+
+class StartupTimer:
+    """
+    Records how long each startup phase took, from the moment it's created
+    to the first rendered frame.
+    """
+    def __init__(self):
+        self.start  = perf_counter()
+        self.phases = []
+        self._last  = self.start
+
+    def mark(self, phase: str):
+        now = perf_counter()
+        self.phases.append((phase, now - self._last))
+        self._last = now
+
+    @property
+    def total(self) -> float:
+        return self._last - self.start
+
+    def report(self) -> str:
+        lines = [f"    ¤ {phase}: {duration * 1000:.1f} ms" for phase, duration in self.phases]
+        lines.append(f"    ¤ Time to first frame: {self.total * 1000:.1f} ms")
+        return "Startup timings:\n" + "\n".join(lines)
+
+
+LOG_PATH        = './ytd.log'
+LOG_MAX_BYTES   = 524288
+LOG_BACKUPS     = 3
+LOG_FORMAT      = '[%(asctime)s] [%(levelname)s] [%(name)s] %(message)s'
+LOG_DATE_FORMAT = '%H:%M:%S'
+# the same warning is written at most once per interval, seconds.
+REPEAT_INTERVAL = 30.0
+REPEAT_MAX_KEYS = 1000
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    One JSON object per line, for log shippers.
+    """
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii = False)
+
+
+class RepeatFilter(logging.Filter):
+    """
+    Drops warnings and errors that were already logged, word for word, in
+    the last `interval` seconds. Messages that differ in any way, e.g. the
+    failures of different playlist items, are all kept. The next one let
+    through says how many were dropped.
+    """
+    def __init__(self, interval: float = REPEAT_INTERVAL):
+        super().__init__()
+        self.interval = interval
+        self._seen    = {}
+        self._lock    = Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno < logging.WARNING:
+            return True
+        message = record.getMessage()
+        key     = (record.levelno, message)
+        now     = monotonic()
+        with self._lock:
+            last, dropped = self._seen.get(key, (None, 0))
+            if last is not None and now - last < self.interval:
+                self._seen[key] = (last, dropped + 1)
+                return False
+            self._seen[key] = (now, 0)
+            if len(self._seen) > REPEAT_MAX_KEYS:
+                self._seen = {k: v for k, v in self._seen.items() if now - v[0] < self.interval}
+        if dropped:
+            record.msg  = f"{message} (repeated {dropped} more times)"
+            record.args = None
+        return True
+
+
 class LOGGER:
+    """
+    The app's logger. Every instance shares one `YTD` logger whose records
+    are put on a queue and written to `LOG_PATH` by a single background
+    thread, so logging never waits on the disk.
+    """
+    _logger   = None
+    _listener = None
+    _handler  = None
+    _lock     = Lock()
+
     def __init__(self):
-        self.logger = logging.getLogger("YTD")
-        log_handler = logging.handlers.RotatingFileHandler('./ytd.log',
-                                                maxBytes = 524288,
-                                                backupCount = 3
-                                                )
-        logging.basicConfig(encoding = 'utf-8',
-                        level    = logging.INFO,
-                        format   = '[%(asctime)s] [%(levelname)s] [%(name)s] %(message)s',
-                        datefmt  = '%H:%M:%S',
-                        handlers = [log_handler]
-                    )
+        if LOGGER._logger is None:
+            with LOGGER._lock:
+                if LOGGER._logger is None:
+                    LOGGER._setup()
+        self.logger = LOGGER._logger
+
+    @staticmethod
+    def _setup():
+        file_handler = logging.handlers.RotatingFileHandler(
+            LOG_PATH,
+            maxBytes    = LOG_MAX_BYTES,
+            backupCount = LOG_BACKUPS,
+            encoding    = 'utf-8',
+            delay       = True,
+        )
+        json_format = os.environ.get("YTD_LOG_FORMAT", "").lower() == "json"
+        file_handler.setFormatter(JsonFormatter() if json_format else logging.Formatter(LOG_FORMAT, LOG_DATE_FORMAT))
+
+        log_queue = SimpleQueue()
+        listener  = logging.handlers.QueueListener(log_queue, file_handler)
+        logger    = logging.getLogger("YTD")
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+        logger.addFilter(RepeatFilter())
+        logger.addHandler(logging.handlers.QueueHandler(log_queue))
+        listener.start()
+        atexit.register(listener.stop)
+
+        LOGGER._handler  = file_handler
+        LOGGER._listener = listener
+        LOGGER._logger   = logger
+
+    @staticmethod
+    def set_json(enabled: bool = True):
+        """
+        Switches the log file between plain text and JSON lines.
+        """
+        LOGGER()
+        LOGGER._handler.setFormatter(JsonFormatter() if enabled else logging.Formatter(LOG_FORMAT, LOG_DATE_FORMAT))
 
     def debug(self, msg: str):
         self.logger.debug(msg)
@@ -46,12 +199,10 @@ class LOGGER:
         userOSver     = platform.version()
         workDir       = parent_path
         exeDir        = executable_path() + '\\'
-        logfile = open("./ytd.log", "a")
-        logfile.write("\n--- YouTube Downloader ---\n\n")
-        logfile.write(f"    ¤ Version: {LOCAL_VERSION}\n")
-        logfile.write(f"    ¤ Operating System: {userOS} {userOSrel} x{userOSarch[0][:2]} v{userOSver}\n")
-        logfile.write(f"    ¤ Working Directory: {workDir}\n")
-        logfile.write(f"    ¤ Executable Directory: {exeDir}\n\n\n")
-        logfile.flush()
-        logfile.close()
-
+        self.logger.info(
+            "\n--- YouTube Downloader ---\n\n"
+            f"    ¤ Version: {LOCAL_VERSION}\n"
+            f"    ¤ Operating System: {userOS} {userOSrel} x{userOSarch[0][:2]} v{userOSver}\n"
+            f"    ¤ Working Directory: {workDir}\n"
+            f"    ¤ Executable Directory: {exeDir}\n"
+        )
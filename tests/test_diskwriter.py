@@ -0,0 +1,97 @@
+import os
+import random
+import tempfile
+import unittest
+
+from concurrent.futures import ThreadPoolExecutor
+from src                import diskwriter
+
+SIZE = 3 * 1024 * 1024 + 12345
+
+
+def chunked(data: bytes, start: int, end: int, rng: random.Random, max_chunk: int = 70000):
+    """
+    Splits data[start:end] into chunks of random sizes, as (offset, bytes).
+    """
+    pos = start
+    while pos < end:
+        size = min(rng.randint(1, max_chunk), end - pos)
+        yield pos, data[pos:pos + size]
+        pos += size
+
+
+class DiskWriterTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.path   = os.path.join(self.folder.name, "out.part")
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def read(self) -> bytes:
+        with open(self.path, "rb") as f:
+            return f.read()
+
+    def test_random_chunks_and_unaligned_segments(self):
+        for seed in range(10):
+            with self.subTest(seed = seed):
+                rng    = random.Random(seed)
+                data   = rng.randbytes(SIZE)
+                bounds = sorted({0, SIZE, *(rng.randrange(1, SIZE) for _ in range(rng.randint(1, 6)))})
+                writer = diskwriter.DiskWriter(self.path, SIZE, buffer_size = rng.choice([4096, 65536, 1024 * 1024]))
+
+                def fill(segment: tuple[int, int]):
+                    for offset, chunk in chunked(data, *segment, rng = random.Random(segment[0])):
+                        writer.write(offset, chunk)
+                        # like a journal commit, the next run starts unaligned.
+                        if rng.random() < 0.01:
+                            writer.flush(offset + len(chunk))
+
+                with ThreadPoolExecutor(max_workers = len(bounds) - 1) as pool:
+                    list(pool.map(fill, zip(bounds, bounds[1:])))
+                writer.close(SIZE)
+                self.assertEqual(self.read(), data)
+                os.remove(self.path)
+
+    def test_short_chunk_crossing_the_buffer(self):
+        # a run starting unaligned whose last chunk is shorter than the
+        # distance past the alignment boundary.
+        data   = random.Random(1).randbytes(3000 + 1024 * 1024 + 20)
+        writer = diskwriter.DiskWriter(self.path, len(data), buffer_size = 1024 * 1024)
+        writer.write(0, data[:3000])
+        writer.flush()
+        writer.write(3000, data[3000:3000 + 1024 * 1024 - 10])
+        writer.write(3000 + 1024 * 1024 - 10, data[3000 + 1024 * 1024 - 10:])
+        writer.close(len(data))
+        self.assertEqual(self.read(), data)
+
+    def test_flush_only_waits_for_its_run(self):
+        writer = diskwriter.DiskWriter(self.path, 2 * 8192)
+        writer.write(0, b"a" * 100)
+        writer.write(8192, b"b" * 100)
+        writer.flush(100)
+        self.assertNotIn(100, writer._runs)
+        self.assertIn(8292, writer._runs)
+        writer.close(2 * 8192)
+        data = self.read()
+        self.assertEqual(data[:100], b"a" * 100)
+        self.assertEqual(data[8192:8292], b"b" * 100)
+
+    def test_close_truncates_preallocated_space(self):
+        writer = diskwriter.DiskWriter(self.path, 10000)
+        writer.write(0, b"x" * 5000)
+        writer.close(5000)
+        self.assertEqual(self.read(), b"x" * 5000)
+
+    def test_errors_are_raised_to_the_caller(self):
+        writer = diskwriter.DiskWriter(self.path, buffer_size = 4096)
+        writer._f.close()
+        with self.assertRaises(IOError):
+            writer.write(0, b"x" * 8192)
+            writer.flush()
+        with self.assertRaises(IOError):
+            writer.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
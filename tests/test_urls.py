@@ -0,0 +1,117 @@
+import unittest
+
+from src import urls
+
+VIDEO_ID    = "dQw4w9WgXcQ"
+PLAYLIST_ID = "PLrAXtmErZgOeiKm4sgNOknGvNjby9efdf"
+CHANNEL_ID  = "UC38IQsAvIsxxjztdMZQtwHA"
+WATCH_URL   = f"https://www.youtube.com/watch?v={VIDEO_ID}"
+
+# (link, kind, video id, playlist id, channel), kind is `None` for links
+# that must be rejected.
+CORPUS = [
+    # watch
+    (f"https://www.youtube.com/watch?v={VIDEO_ID}", urls.VIDEO, VIDEO_ID, None, None),
+    (f"http://youtube.com/watch?v={VIDEO_ID}", urls.VIDEO, VIDEO_ID, None, None),
+    (f"www.youtube.com/watch?v={VIDEO_ID}", urls.VIDEO, VIDEO_ID, None, None),
+    (f"youtube.com/watch?v={VIDEO_ID}", urls.VIDEO, VIDEO_ID, None, None),
+    (f"https://m.youtube.com/watch?v={VIDEO_ID}", urls.VIDEO, VIDEO_ID, None, None),
+    (f"https://www.youtube.com/watch?feature=share&v={VIDEO_ID}&t=42s", urls.VIDEO, VIDEO_ID, None, None),
+    (f"  https://www.youtube.com/watch?v={VIDEO_ID}  ", urls.VIDEO, VIDEO_ID, None, None),
+    (f"HTTPS://WWW.YOUTUBE.COM/watch?v={VIDEO_ID}", urls.VIDEO, VIDEO_ID, None, None),
+    # youtu.be
+    (f"https://youtu.be/{VIDEO_ID}", urls.VIDEO, VIDEO_ID, None, None),
+    (f"https://youtu.be/{VIDEO_ID}?si=abcdef&t=10", urls.VIDEO, VIDEO_ID, None, None),
+    (f"youtu.be/{VIDEO_ID}", urls.VIDEO, VIDEO_ID, None, None),
+    (f"https://www.youtu.be/{VIDEO_ID}", urls.VIDEO, VIDEO_ID, None, None),
+    # shorts
+    (f"https://www.youtube.com/shorts/{VIDEO_ID}", urls.SHORT, VIDEO_ID, None, None),
+    (f"https://youtube.com/shorts/{VIDEO_ID}?feature=share", urls.SHORT, VIDEO_ID, None, None),
+    (f"https://m.youtube.com/shorts/{VIDEO_ID}", urls.SHORT, VIDEO_ID, None, None),
+    # embed
+    (f"https://www.youtube.com/embed/{VIDEO_ID}", urls.VIDEO, VIDEO_ID, None, None),
+    (f"https://www.youtube-nocookie.com/embed/{VIDEO_ID}?autoplay=1", urls.VIDEO, VIDEO_ID, None, None),
+    (f"https://www.youtube.com/v/{VIDEO_ID}", urls.VIDEO, VIDEO_ID, None, None),
+    (f"https://www.youtube.com/e/{VIDEO_ID}", urls.VIDEO, VIDEO_ID, None, None),
+    # live
+    (f"https://www.youtube.com/live/{VIDEO_ID}", urls.VIDEO, VIDEO_ID, None, None),
+    (f"https://youtube.com/live/{VIDEO_ID}?feature=share", urls.VIDEO, VIDEO_ID, None, None),
+    # music
+    (f"https://music.youtube.com/watch?v={VIDEO_ID}", urls.VIDEO, VIDEO_ID, None, None),
+    (f"https://music.youtube.com/playlist?list={PLAYLIST_ID}", urls.PLAYLIST, None, PLAYLIST_ID, None),
+    # playlist
+    (f"https://www.youtube.com/playlist?list={PLAYLIST_ID}", urls.PLAYLIST, None, PLAYLIST_ID, None),
+    (f"youtube.com/playlist?list={PLAYLIST_ID}&si=abcdef", urls.PLAYLIST, None, PLAYLIST_ID, None),
+    (f"https://www.youtube.com/watch?list={PLAYLIST_ID}", urls.PLAYLIST, None, PLAYLIST_ID, None),
+    # mixed v + list, a video opened from a playlist
+    (f"https://www.youtube.com/watch?v={VIDEO_ID}&list={PLAYLIST_ID}", urls.VIDEO, VIDEO_ID, PLAYLIST_ID, None),
+    (f"https://www.youtube.com/watch?list={PLAYLIST_ID}&v={VIDEO_ID}&index=3", urls.VIDEO, VIDEO_ID, PLAYLIST_ID, None),
+    (f"https://youtu.be/{VIDEO_ID}?list={PLAYLIST_ID}", urls.VIDEO, VIDEO_ID, PLAYLIST_ID, None),
+    (f"https://music.youtube.com/watch?v={VIDEO_ID}&list={PLAYLIST_ID}", urls.VIDEO, VIDEO_ID, PLAYLIST_ID, None),
+    # channel
+    (f"https://www.youtube.com/channel/{CHANNEL_ID}", urls.CHANNEL, None, None, CHANNEL_ID),
+    ("https://www.youtube.com/@RickAstleyYT", urls.CHANNEL, None, None, "@RickAstleyYT"),
+    ("https://www.youtube.com/c/RickAstley", urls.CHANNEL, None, None, "c/RickAstley"),
+    ("https://www.youtube.com/user/RickAstleyVEVO", urls.CHANNEL, None, None, "user/RickAstleyVEVO"),
+    # invalid
+    ("", None, None, None, None),
+    ("   ", None, None, None, None),
+    ("not a link", None, None, None, None),
+    (f"https://vimeo.com/watch?v={VIDEO_ID}", None, None, None, None),
+    (f"https://www.youtube.com.evil.com/watch?v={VIDEO_ID}", None, None, None, None),
+    (f"https://notyoutube.com/watch?v={VIDEO_ID}", None, None, None, None),
+    ("https://www.youtube.com/", None, None, None, None),
+    ("https://www.youtube.com/watch", None, None, None, None),
+    ("https://www.youtube.com/watch?v=short", None, None, None, None),
+    (f"https://www.youtube.com/watch?v={VIDEO_ID}x", None, None, None, None),
+    ("https://www.youtube.com/watch?v=dQw4w9WgX!Q", None, None, None, None),
+    ("https://youtu.be/", None, None, None, None),
+    ("https://youtu.be/tooshort", None, None, None, None),
+    ("https://www.youtube.com/shorts/", None, None, None, None),
+    ("https://www.youtube.com/embed/tooshort", None, None, None, None),
+    ("https://www.youtube.com/playlist", None, None, None, None),
+    ("https://www.youtube.com/playlist?list=PL", None, None, None, None),
+    ("https://www.youtube.com/channel/UCtooshort", None, None, None, None),
+    ("https://www.youtube.com/results?search_query=rick", None, None, None, None),
+    ("https://www.youtube.com/feed/subscriptions", None, None, None, None),
+    ("https://[::1", None, None, None, None),
+]
+
+
+class ParseTest(unittest.TestCase):
+    def test_corpus(self):
+        for link, kind, video_id, playlist_id, channel in CORPUS:
+            with self.subTest(link = link):
+                parsed = urls.parse(link)
+                if kind is None:
+                    self.assertIsNone(parsed)
+                    continue
+                self.assertEqual(parsed, urls.ParsedUrl(kind, video_id, playlist_id, channel))
+
+    def test_none(self):
+        self.assertIsNone(urls.parse(None))
+
+    def test_canonical_urls(self):
+        for link, expected in [
+            (f"https://youtu.be/{VIDEO_ID}?t=10", WATCH_URL),
+            (f"https://www.youtube.com/shorts/{VIDEO_ID}", WATCH_URL),
+            (f"https://www.youtube-nocookie.com/embed/{VIDEO_ID}", WATCH_URL),
+            (f"https://music.youtube.com/watch?v={VIDEO_ID}&list={PLAYLIST_ID}", WATCH_URL),
+            (f"youtube.com/playlist?list={PLAYLIST_ID}&si=abcdef", f"https://www.youtube.com/playlist?list={PLAYLIST_ID}"),
+            (f"https://m.youtube.com/channel/{CHANNEL_ID}", f"https://www.youtube.com/channel/{CHANNEL_ID}"),
+            ("https://youtube.com/@RickAstleyYT", "https://www.youtube.com/@RickAstleyYT"),
+            ("https://youtube.com/c/RickAstley", "https://www.youtube.com/c/RickAstley"),
+            ("not a link", None),
+        ]:
+            with self.subTest(link = link):
+                self.assertEqual(urls.normalize(link), expected)
+
+    def test_kind_helpers(self):
+        for link, kind, *_ in CORPUS:
+            with self.subTest(link = link):
+                self.assertEqual(urls.is_video_url(link), kind in (urls.VIDEO, urls.SHORT))
+                self.assertEqual(urls.is_playlist_url(link), kind == urls.PLAYLIST)
+
+
+if __name__ == "__main__":
+    unittest.main()